@@ -1,10 +1,25 @@
 import streamlit as st
-import random
-import string
 import time
-import json
-import os
-from datetime import datetime, timedelta
+
+from game_assets import (
+    BACKGROUND_AUDIO, FOOTER_HTML, PAGE_CSS, RULES_MARKDOWN, TENSION_AUDIO, TITLE_HTML,
+    describe_duration, format_time, get_funny_game_over_message, get_funny_role_description,
+)
+from game_config import get_config, room_setting
+from game_engine import (
+    LOCATIONS, calculate_time_remaining, claim_seat, count_votes, create_new_game,
+    end_game, end_if_time_up, get_write_buffer, guess_location, join_game, leave_game,
+    reset_game, resolve_votes, room_rng, start_game, start_voting, toggle_ready, vote_player,
+)
+from game_events import RoomView, get_event_bus
+from game_store import get_store
+from rate_limit import ActionRateLimiter
+from refresh_policy import FINAL_SECONDS, RefreshBackoff, get_refresh_stats, next_refresh
+from session_memory import (
+    get_session_registry, inspect_session, reset_game_state, track_game,
+)
+from spectator import get_spectator_cache
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Page config
 st.set_page_config(
@@ -13,36 +28,21 @@ st.set_page_config(
     layout="wide"
 )
 
-# File to store game data (shared across all sessions)
-GAMES_FILE = "games_data.json"
-
-def load_games():
-    """Load games from file"""
-    try:
-        if os.path.exists(GAMES_FILE):
-            with open(GAMES_FILE, 'r') as f:
-                return json.load(f)
-        return {}
-    except:
-        return {}
-
-def save_games(games):
-    """Save games to file"""
-    try:
-        with open(GAMES_FILE, 'w') as f:
-            json.dump(games, f, default=str, indent=2)
-    except Exception as e:
-        st.error(f"Error saving games: {e}")
-
-def get_games():
-    """Get current games (always fresh from file)"""
-    return load_games()
-
-def update_game(game_id, game_data):
-    """Update a specific game"""
-    games = load_games()
-    games[game_id] = game_data
-    save_games(games)
+# Shared room storage and event feed (see game_store.py and game_events.py)
+store = get_store()
+bus = get_event_bus()
+
+def get_game(game_id):
+    """Get this session's copy of a game, patched with the room's latest events"""
+    bus.pump(store)
+    view = st.session_state.get('room_view')
+    if view is None or view.game_id != game_id:
+        if view is not None:
+            view.close()
+        view = RoomView(game_id, bus, store)
+        st.session_state.room_view = view
+    # Include this process's buffered clicks so the page reflects them right away
+    return get_write_buffer().preview(game_id, view.refresh())
 
 # Initialize session state
 def init_session_state():
@@ -54,436 +54,40 @@ def init_session_state():
         st.session_state.is_host = False
     if 'location_guesses' not in st.session_state:
         st.session_state.location_guesses = []
-
-def generate_game_id():
-    """Generate a 6-character game ID"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-
-def create_new_game():
-    """Create a new game room"""
-    game_id = generate_game_id()
-    games = load_games()
-    
-    # Make sure game_id is unique
-    while game_id in games:
-        game_id = generate_game_id()
-    
-    games[game_id] = {
-        'players': {},
-        'ready_players': [],
-        'host': None,
-        'game_started': False,
-        'game_ended': False,
-        'spy': None,
-        'location': None,
-        'created_at': str(datetime.now()),
-        'start_time': None,
-        'votes': {},
-        'voting_phase': False,
-        'winner': None,
-        'elimination_target': None,
-        'location_guesses': {}
-    }
-    save_games(games)
-    return game_id
-
-def join_game(game_id, player_name, is_host=False):
-    """Join a game room"""
-    games = load_games()
-    if game_id in games:
-        games[game_id]['players'][player_name] = {
-            'joined_at': str(datetime.now()),
-            'is_ready': False
-        }
-        if is_host:
-            games[game_id]['host'] = player_name
-        save_games(games)
-        return True
-    return False
-
-def toggle_ready(game_id, player_name):
-    """Toggle player ready status"""
-    games = load_games()
-    if game_id in games and player_name in games[game_id]['players']:
-        current_status = games[game_id]['players'][player_name]['is_ready']
-        games[game_id]['players'][player_name]['is_ready'] = not current_status
-        
-        # Update ready_players list
-        ready_players = games[game_id]['ready_players']
-        if not current_status:
-            if player_name not in ready_players:
-                ready_players.append(player_name)
-        else:
-            if player_name in ready_players:
-                ready_players.remove(player_name)
-        
-        games[game_id]['ready_players'] = ready_players
-        save_games(games)
+    if 'rate_limiter' not in st.session_state:
+        st.session_state.rate_limiter = ActionRateLimiter()
+    if 'refresh_backoff' not in st.session_state:
+        st.session_state.refresh_backoff = RefreshBackoff()
+
+def leave_room_session():
+    """Drop everything this session kept about its room"""
+    view = st.session_state.get('room_view')
+    if view is not None:
+        view.close()
+    st.session_state.room_view = None
+    st.session_state.current_game_id = None
+    st.session_state.player_name = None
+    st.session_state.is_host = False
+    reset_game_state(st.session_state)
+
+def allow_action(action):
+    """Rate-limit button spam; tells the player to slow down when it kicks in"""
+    if st.session_state.rate_limiter.allow(action):
         return True
+    st.toast("🐢 Easy there, agent! Too many clicks, try again in a second.")
     return False
 
-def leave_game(game_id, player_name):
-    """Remove player from game"""
-    games = load_games()
-    if game_id in games and player_name in games[game_id]['players']:
-        del games[game_id]['players'][player_name]
-        if player_name in games[game_id]['ready_players']:
-            games[game_id]['ready_players'].remove(player_name)
-        
-        # Remove from votes
-        if player_name in games[game_id]['votes']:
-            del games[game_id]['votes'][player_name]
-        
-        # Remove from location guesses
-        if player_name in games[game_id]['location_guesses']:
-            del games[game_id]['location_guesses'][player_name]
-        
-        # If no players left, delete the game
-        if not games[game_id]['players']:
-            del games[game_id]
-        else:
-            # If host left, assign new host
-            if games[game_id]['host'] == player_name:
-                remaining_players = list(games[game_id]['players'].keys())
-                if remaining_players:
-                    games[game_id]['host'] = remaining_players[0]
-        
-        save_games(games)
-
-def start_game(game_id):
-    """Start the game - assign spy and location"""
-    games = load_games()
-    if game_id not in games:
-        return False
-    
-    game = games[game_id]
-    players = list(game['players'].keys())
-    
-    if len(players) < 3:
-        return False
-    
-    # Assign spy randomly
-    spy = random.choice(players)
-    game['spy'] = spy
-    
-    # Expanded locations list
-    locations = [
-        "Restaurant", "School", "Hospital", "Bank", "Airport",
-        "Beach", "Casino", "Circus", "Embassy", "Hotel",
-        "Military Base", "Movie Studio", "Museum", "Ocean Liner",
-        "Passenger Train", "Pirate Ship", "Polar Station", "Police Station",
-        "Space Station", "Submarine", "Supermarket", "Theater", "University",
-        "Library", "Zoo", "Gym", "Spa", "Bakery", "Farm", "Prison",
-        "Art Gallery", "Nightclub", "Workshop", "Cathedral", "Laboratory"
-    ]
-    
-    game['location'] = random.choice(locations)
-    game['game_started'] = True
-    game['start_time'] = str(datetime.now())
-    game['votes'] = {}
-    game['voting_phase'] = False
-    game['winner'] = None
-    game['game_ended'] = False
-    game['location_guesses'] = {}
-    
-    save_games(games)
-    return True
-
-def vote_player(game_id, voter, target):
-    """Vote to eliminate a player (anonymously)"""
-    games = load_games()
-    if game_id in games:
-        # Create anonymous vote ID
-        vote_id = f"vote_{len(games[game_id]['votes']) + 1}"
-        games[game_id]['votes'][vote_id] = {'voter': voter, 'target': target}
-        save_games(games)
-        return True
-    return False
-
-def guess_location(game_id, player_name, guessed_location):
-    """Submit a location guess (spy only)"""
-    games = load_games()
-    if game_id in games:
-        games[game_id]['location_guesses'][player_name] = guessed_location
-        save_games(games)
-        return True
-    return False
-
-def start_voting(game_id):
-    """Start the voting phase"""
-    games = load_games()
-    if game_id in games:
-        games[game_id]['voting_phase'] = True
-        games[game_id]['votes'] = {}
-        save_games(games)
-
-def end_game(game_id, winner, elimination_target=None):
-    """End the game with a winner"""
-    games = load_games()
-    if game_id in games:
-        games[game_id]['game_ended'] = True
-        games[game_id]['winner'] = winner
-        if elimination_target:
-            games[game_id]['elimination_target'] = elimination_target
-        save_games(games)
-
-def calculate_time_remaining(start_time_str):
-    """Calculate remaining time from start"""
-    try:
-        start_time = datetime.fromisoformat(start_time_str)
-        elapsed = datetime.now() - start_time
-        total_seconds = 300  # 5 minutes
-        remaining_seconds = total_seconds - elapsed.total_seconds()
-        return max(0, remaining_seconds)
-    except:
-        return 300
-
-def format_time(seconds):
-    """Format seconds into MM:SS"""
-    minutes = int(seconds // 60)
-    seconds = int(seconds % 60)
-    return f"{minutes:02d}:{seconds:02d}"
-
-def get_funny_role_description(is_spy):
-    """Get funny role descriptions"""
-    if is_spy:
-        descriptions = [
-            "🕵️ You're the SPY! Time to channel your inner 007... or Mr. Bean!",
-            "🕵️ CONGRATULATIONS! You're officially lost and confused!",
-            "🕵️ You're the SPY! Your mission: Figure out where you are without looking like a tourist!",
-            "🕵️ SPY ALERT! You're about as undercover as a giraffe in a zoo!",
-            "🕵️ You're the SPY! Try not to ask 'Where am I?' directly... that's a dead giveaway!"
-        ]
-    else:
-        descriptions = [
-            "👥 You're NOT the spy! Time to play detective and catch that sneaky impostor!",
-            "👥 Congrats! You actually know where you are (shocking, we know)!",
-            "👥 You're a REGULAR PERSON! Your job: Spot the clueless spy among you!",
-            "👥 NOT A SPY! Now go catch that suspicious person asking weird questions!",
-            "👥 You're in the clear! Time to hunt down the person who clearly doesn't belong!"
-        ]
-    return random.choice(descriptions)
-
-def get_funny_game_over_message(winner, spy_name, location, eliminated_player=None):
-    """Get funny game over messages"""
-    if winner == "spy":
-        messages = [
-            f"🎉 {spy_name} pulls off the ultimate bamboozle! The spy wins by being sneakier than a cat burglar!",
-            f"🕵️ PLOT TWIST! {spy_name} was the spy all along and fooled everyone! Master of disguise or just lucky?",
-            f"🎭 {spy_name} deserves an Oscar for that performance! The spy wins by pure deception!",
-            f"🤡 Everyone got played by {spy_name}! The spy wins and probably can't stop laughing!",
-            f"🎪 Ladies and gentlemen, {spy_name} just pulled off the heist of the century... of confusion!"
-        ]
-        if eliminated_player:
-            messages.append(f"💀 Poor {eliminated_player} got voted out while {spy_name} was laughing in the shadows!")
-    else:
-        messages = [
-            f"🔍 BUSTED! {spy_name} got caught red-handed! The detectives win this round!",
-            f"👮 Justice is served! {spy_name}'s cover was blown harder than a birthday candle!",
-            f"🎯 GOTCHA! {spy_name} was about as subtle as a bull in a china shop!",
-            f"🕵️‍♀️ Case closed! {spy_name} should probably stick to their day job!",
-            f"🏆 The good guys win! {spy_name} got exposed faster than a bad lie!"
-        ]
-    
-    return random.choice(messages)
-
 # Initialize
 init_session_state()
 
 # Add enhanced CSS for animations and styling
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Creepster&family=Righteous:wght@400&display=swap');
-
-.main-title {
-    font-family: 'Creepster', cursive;
-    font-size: 4rem;
-    text-align: center;
-    background: linear-gradient(45deg, #ff6b6b, #4ecdc4, #45b7d1, #96ceb4, #ffeaa7);
-    background-size: 300% 300%;
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    animation: gradient-shift 3s ease-in-out infinite;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    margin-bottom: 10px;
-}
-
-.subtitle {
-    font-family: 'Righteous', cursive;
-    font-size: 1.5rem;
-    text-align: center;
-    color: #666;
-    font-style: italic;
-    margin-bottom: 30px;
-}
-
-@keyframes gradient-shift {
-    0% { background-position: 0% 50%; }
-    50% { background-position: 100% 50%; }
-    100% { background-position: 0% 50%; }
-}
-
-.timer-normal {
-    font-size: 2.5rem;
-    font-weight: bold;
-    color: #0066cc;
-    text-align: center;
-    padding: 15px;
-    border: 3px solid #0066cc;
-    border-radius: 15px;
-    margin: 15px 0;
-    background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-    box-shadow: 0 4px 15px rgba(0,102,204,0.3);
-}
-
-.timer-danger {
-    font-size: 2.5rem;
-    font-weight: bold;
-    color: #ff0000;
-    text-align: center;
-    padding: 15px;
-    border: 3px solid #ff0000;
-    border-radius: 15px;
-    margin: 15px 0;
-    background: linear-gradient(135deg, #ffefef 0%, #ffcccc 100%);
-    animation: pulse-danger 1s infinite;
-    box-shadow: 0 4px 15px rgba(255,0,0,0.4);
-}
-
-@keyframes pulse-danger {
-    0% { opacity: 1; transform: scale(1); }
-    50% { opacity: 0.7; transform: scale(1.05); }
-    100% { opacity: 1; transform: scale(1); }
-}
-
-.winner-announcement {
-    font-size: 3rem;
-    font-weight: bold;
-    text-align: center;
-    padding: 30px;
-    border-radius: 20px;
-    margin: 30px 0;
-    animation: celebrate 2s ease-in-out;
-    box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-}
-
-.spy-wins {
-    background: linear-gradient(45deg, #ff6b6b, #ff8e8e);
-    color: white;
-}
-
-.non-spy-wins {
-    background: linear-gradient(45deg, #4ecdc4, #44a08d);
-    color: white;
-}
-
-@keyframes celebrate {
-    0% { transform: scale(0.5) rotate(-180deg); opacity: 0; }
-    50% { transform: scale(1.1) rotate(0deg); }
-    100% { transform: scale(1) rotate(0deg); opacity: 1; }
-}
-
-.vote-section {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 20px;
-    border-radius: 15px;
-    margin: 15px 0;
-    box-shadow: 0 6px 20px rgba(102,126,234,0.3);
-}
-
-.role-card {
-    padding: 20px;
-    border-radius: 15px;
-    margin: 15px 0;
-    text-align: center;
-    font-size: 1.2rem;
-    font-weight: bold;
-    box-shadow: 0 6px 20px rgba(0,0,0,0.1);
-    animation: role-reveal 1s ease-out;
-}
-
-.spy-card {
-    background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-    color: white;
-    border: 3px solid #d63031;
-}
-
-.non-spy-card {
-    background: linear-gradient(135deg, #00b894 0%, #00a085 100%);
-    color: white;
-    border: 3px solid #00b894;
-}
-
-@keyframes role-reveal {
-    0% { opacity: 0; transform: translateY(-20px); }
-    100% { opacity: 1; transform: translateY(0); }
-}
-
-.location-guess-section {
-    background: linear-gradient(135deg, #fda085 0%, #f093fb 100%);
-    padding: 20px;
-    border-radius: 15px;
-    margin: 15px 0;
-    color: white;
-    box-shadow: 0 6px 20px rgba(253,160,133,0.3);
-}
-
-.game-over-message {
-    font-size: 1.5rem;
-    text-align: center;
-    padding: 20px;
-    margin: 20px 0;
-    border-radius: 15px;
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    animation: message-bounce 1s ease-out;
-}
-
-@keyframes message-bounce {
-    0% { transform: translateY(-30px); opacity: 0; }
-    50% { transform: translateY(5px); }
-    100% { transform: translateY(0); opacity: 1; }
-}
-
-.player-list {
-    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-    padding: 15px;
-    border-radius: 10px;
-    margin: 10px 0;
-    color: white;
-}
-
-/* Button enhancements */
-.stButton > button {
-    border-radius: 10px !important;
-    font-weight: bold !important;
-    transition: all 0.3s ease !important;
-}
-
-.stButton > button:hover {
-    transform: translateY(-2px) !important;
-    box-shadow: 0 4px 15px rgba(0,0,0,0.2) !important;
-}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 # Add background sound effect
-st.markdown("""
-<audio autoplay loop>
-    <source src="data:audio/wav;base64,UklGRnYBAABXQVZFZm10IBAAAAABAAEARKwAAIhYAQACABAAZGF0YVIBAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=" type="audio/wav">
-</audio>
-""", unsafe_allow_html=True)
+st.markdown(BACKGROUND_AUDIO, unsafe_allow_html=True)
 
 # Enhanced main title
-st.markdown("""
-<div class="main-title">
-    🕵️ WHOSPIES? 🕵️
-</div>
-<div class="subtitle">
-    The Ultimate Social Deduction Game of Secrets, Lies, and Questionable Acting Skills!
-</div>
-""", unsafe_allow_html=True)
+st.markdown(TITLE_HTML, unsafe_allow_html=True)
 
 # Sidebar for game controls
 with st.sidebar:
@@ -492,13 +96,93 @@ with st.sidebar:
     # Auto-refresh toggle
     auto_refresh = st.checkbox("🔄 Auto-refresh (Live Updates)", value=True)
     if auto_refresh:
-        refresh_rate = st.slider("⚡ Refresh rate (seconds)", 1, 5, 2)
+        config = get_config()
+        refresh_rate = st.slider(
+            "⚡ Refresh rate (seconds)",
+            config['refresh_min_seconds'], config['refresh_max_seconds'], config['refresh_seconds'],
+        )
+        st.caption(f"Faster while voting and in the last {FINAL_SECONDS} seconds, slower when nothing's happening.")
     
     # Sound toggle
     sound_enabled = st.checkbox("🔊 Sound Effects", value=True)
 
+# Spectators watch a room through ?spectate=GAMEID
+spectate_id = st.query_params.get("spectate", "").strip().upper()
+
+# Tournament players take the seat the scheduler gave them through the
+# ?table=GAMEID&player=NAME&seat=SECRET link it printed for them
+seat_table = st.query_params.get("table", "").strip().upper()
+seat_player = st.query_params.get("player", "").strip()
+seat_token = st.query_params.get("seat", "").strip()
+if seat_table and seat_player:
+    for param in ("table", "player", "seat"):
+        if param in st.query_params:
+            del st.query_params[param]
+    if (seat_table, seat_player) != (st.session_state.current_game_id, st.session_state.player_name):
+        if claim_seat(seat_table, seat_player, seat_token):
+            leave_room_session()
+            st.session_state.current_game_id = seat_table
+            st.session_state.player_name = seat_player
+            st.toast(f"🪑 Took your seat at table {seat_table}!")
+        else:
+            st.error("🚫 That seat link isn't valid, or another agent already took the seat!")
+
+# The room this page shows and its version, for the refresh policy
+refresh_target = None
+refresh_as_host = False
+
 # Main game logic
-if st.session_state.current_game_id is None:
+if spectate_id:
+    # Read-only view, rendered from the room's shared redacted snapshot
+    snapshot = get_spectator_cache().get(spectate_id)
+    refresh_target = (spectate_id, snapshot, snapshot['version'] if snapshot else None)
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.header(f"👀 Watching Mission: {spectate_id}")
+    with col2:
+        if st.button("🚪 Stop Watching", type="secondary"):
+            del st.query_params["spectate"]
+            st.rerun()
+    
+    if snapshot is None:
+        st.error("❌ Game not found! Double-check that code!")
+    elif not snapshot['game_started']:
+        st.subheader("🕴️ Agent Briefing Room")
+        st.write(f"🎯 Agents ready: **{len(snapshot['ready_players'])}/{len(snapshot['players'])}**")
+        for p_name in snapshot['players']:
+            ready_status = "🟢" if p_name in snapshot['ready_players'] else "🔴"
+            host_badge = " 👑" if p_name == snapshot['host'] else ""
+            st.write(f"{ready_status} **{p_name}**{host_badge}")
+    elif snapshot['game_ended']:
+        st.markdown(f"""
+        <div class="winner-announcement {'spy-wins' if snapshot['winner'] == 'spy' else 'non-spy-wins'}">
+            🎉 {snapshot['winner'].upper().replace('NON-SPIES', 'DETECTIVES')} WIN! 🎉
+        </div>
+        """, unsafe_allow_html=True)
+        st.write("*The spy and the location stay classified for spectators.*")
+        st.markdown("### 👥 Agents in this Mission:")
+        for p_name in snapshot['players']:
+            st.write(f"• **{p_name}**")
+        if st.button("🔄 Check for a new mission"):
+            st.rerun()
+    else:
+        st.subheader("🎯 Mission in Progress!")
+        if snapshot['start_time']:
+            time_remaining = calculate_time_remaining(snapshot['start_time'], room_setting(snapshot, 'round_seconds'))
+            timer_class = "timer-danger" if time_remaining <= FINAL_SECONDS else "timer-normal"
+            st.markdown(f"""
+            <div class="{timer_class}">
+                ⏰ {format_time(time_remaining)}
+            </div>
+            """, unsafe_allow_html=True)
+        if snapshot['voting_phase']:
+            st.write(f"🗳️ **Anonymous votes cast:** {snapshot['votes_cast']}/{len(snapshot['players'])}")
+        for p_name in snapshot['players']:
+            host_badge = " 👑" if p_name == snapshot['host'] else ""
+            st.write(f"• **{p_name}**{host_badge}")
+
+elif st.session_state.current_game_id is None:
     # Landing page - Create or Join game
     st.header("🎭 Welcome to the World of Espionage!")
     
@@ -509,15 +193,14 @@ if st.session_state.current_game_id is None:
         st.write("*Become the master of ceremonies!*")
         player_name_create = st.text_input("Your Secret Agent Name:", key="create_name", placeholder="Agent 007, Master Spy, etc.")
         
-        if st.button("🚀 Create Game", type="primary"):
+        if st.button("🚀 Create Game", type="primary") and allow_action('create'):
             if player_name_create.strip():
                 game_id = create_new_game()
                 join_game(game_id, player_name_create.strip(), is_host=True)
                 st.session_state.current_game_id = game_id
                 st.session_state.player_name = player_name_create.strip()
                 st.session_state.is_host = True
-                st.success(f"🎉 Game created! Game ID: **{game_id}**")
-                time.sleep(1)
+                st.toast(f"🎉 Game created! Game ID: **{game_id}**")
                 st.rerun()
             else:
                 st.error("🚨 Please enter your secret agent name!")
@@ -528,42 +211,63 @@ if st.session_state.current_game_id is None:
         game_id_join = st.text_input("🔐 Game ID:", key="join_id", placeholder="Enter 6-character code").upper()
         player_name_join = st.text_input("Your Secret Agent Name:", key="join_name", placeholder="Agent Smith, Double-O-Fun, etc.")
         
-        if st.button("🎯 Join Mission"):
+        if st.button("🎯 Join Mission") and allow_action('join'):
             if not game_id_join.strip():
                 st.error("🚨 Please enter a Game ID!")
             elif not player_name_join.strip():
                 st.error("🚨 Please enter your agent name!")
             else:
-                games = get_games()
-                if game_id_join not in games:
+                join_target = store.load(game_id_join)
+                if join_target is None:
                     st.error("❌ Game not found! Double-check that code!")
-                elif player_name_join.strip() in games[game_id_join]['players']:
+                elif player_name_join.strip() in join_target['players']:
                     st.error("👥 Agent name already taken in this mission!")
-                elif games[game_id_join]['game_started'] and not games[game_id_join]['game_ended']:
+                elif join_target['game_started'] and not join_target['game_ended']:
                     st.error("🚫 Mission already in progress!")
                 else:
                     join_game(game_id_join, player_name_join.strip())
                     st.session_state.current_game_id = game_id_join
                     st.session_state.player_name = player_name_join.strip()
-                    st.success(f"✅ Infiltrated game {game_id_join}!")
-                    time.sleep(1)
+                    st.toast(f"✅ Infiltrated game {game_id_join}!")
                     st.rerun()
+    
+    st.markdown("---")
+    st.subheader("👀 Watch a Mission")
+    st.write("*Spectators see who's playing, the timer and the votes, never the spy or the location.*")
+    game_id_watch = st.text_input("🔐 Game ID to watch:", key="watch_id", placeholder="Enter 6-character code").upper()
+    if st.button("👀 Spectate") and allow_action('spectate'):
+        if game_id_watch.strip():
+            st.query_params["spectate"] = game_id_watch.strip()
+            st.rerun()
+        else:
+            st.error("🚨 Please enter a Game ID!")
 
 else:
     # In-game interface
     game_id = st.session_state.current_game_id
     player_name = st.session_state.player_name
-    games = get_games()
-    game = games.get(game_id)
+    game = get_game(game_id)
     
     if not game:
         st.error("💥 Game not found! It might have been terminated.")
-        st.session_state.current_game_id = None
+        leave_room_session()
         st.rerun()
     
+    if player_name not in game['players']:
+        # Left from another tab, or seated at another table by the tournament
+        st.toast(f"🚪 You're no longer an agent in mission {game_id}!")
+        leave_room_session()
+        st.rerun()
+    
+    # New round or new room: forget the last game's guesses
+    track_game(st.session_state, game_id, game)
+    
     # Update host status
     st.session_state.is_host = (game['host'] == player_name)
     
+    refresh_target = (game_id, game, st.session_state.room_view.version)
+    refresh_as_host = st.session_state.is_host
+    
     # Game header
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
@@ -571,9 +275,7 @@ else:
     with col2:
         if st.button("🚪 Abort Mission", type="secondary"):
             leave_game(game_id, player_name)
-            st.session_state.current_game_id = None
-            st.session_state.player_name = None
-            st.session_state.is_host = False
+            leave_room_session()
             st.rerun()
     with col3:
         st.write(f"**Agent:** {player_name}")
@@ -589,7 +291,7 @@ else:
         ready_button_text = "✅ Ready for Action!" if current_ready else "⏳ Still Preparing..."
         ready_button_type = "secondary" if current_ready else "primary"
         
-        if st.button(ready_button_text, type=ready_button_type):
+        if st.button(ready_button_text, type=ready_button_type) and allow_action('ready'):
             toggle_ready(game_id, player_name)
             st.rerun()
         
@@ -628,25 +330,26 @@ else:
             st.markdown("---")
             st.write(f"🎯 Agents ready: **{ready_count}/{total_players}**")
             
-            if total_players >= 3 and ready_count == total_players:
+            min_players = room_setting(game, 'min_players')
+            if total_players >= min_players and ready_count == total_players:
                 if st.button("🚀 Launch Mission!", type="primary"):
                     if start_game(game_id):
-                        st.success("🎯 Mission is a GO!")
-                        time.sleep(1)
+                        st.toast("🎯 Mission is a GO!")
                         st.rerun()
             else:
-                if total_players < 3:
-                    st.info("🔢 Need at least 3 agents to start the mission")
+                if total_players < min_players:
+                    st.info(f"🔢 Need at least {min_players} agents to start the mission")
                 else:
                     st.info("⏳ Waiting for all agents to gear up")
     
     elif game['game_ended']:
-        # Game ended - show results with funny messages
+        # Game ended - show results with funny messages (picked once per game by the room's RNG)
         funny_message = get_funny_game_over_message(
             game['winner'], 
             game['spy'], 
             game['location'], 
-            game.get('elimination_target')
+            game.get('elimination_target'),
+            rng=room_rng(game, "game_over"),
         )
         
         st.markdown(f"""
@@ -691,25 +394,13 @@ else:
         if st.session_state.is_host:
             st.markdown("---")
             if st.button("🔄 Start New Mission", type="primary"):
-                # Reset game state
-                games = get_games()
-                games[game_id]['game_started'] = False
-                games[game_id]['game_ended'] = False
-                games[game_id]['spy'] = None
-                games[game_id]['location'] = None
-                games[game_id]['start_time'] = None
-                games[game_id]['votes'] = {}
-                games[game_id]['voting_phase'] = False
-                games[game_id]['winner'] = None
-                games[game_id]['elimination_target'] = None
-                games[game_id]['ready_players'] = []
-                games[game_id]['location_guesses'] = {}
-                
-                # Reset all players to not ready
-                for p_name in games[game_id]['players']:
-                    games[game_id]['players'][p_name]['is_ready'] = False
-                
-                save_games(games)
+                reset_game(game_id)
+                st.rerun()
+        else:
+            # Auto-refresh keeps polling, slowly, for the restart; no need to wait for it
+            st.markdown("---")
+            st.write("*Waiting for the host to start a new mission...*")
+            if st.button("🔄 Check for a new mission"):
                 st.rerun()
     
     else:
@@ -718,33 +409,27 @@ else:
         
         # Timer
         if game['start_time']:
-            time_remaining = calculate_time_remaining(game['start_time'])
+            time_remaining = calculate_time_remaining(game['start_time'], room_setting(game, 'round_seconds'))
             time_display = format_time(time_remaining)
             
-            # Check if time is up
-            if time_remaining <= 0:
-                if not game['game_ended']:
-                    end_game(game_id, "spy")  # Spy wins if time runs out
-                    st.rerun()
+            # Check if time is up (spy wins if time runs out)
+            if end_if_time_up(game_id, game):
+                st.rerun()
             
             # Display timer with different styles
-            timer_class = "timer-danger" if time_remaining <= 30 else "timer-normal"
+            timer_class = "timer-danger" if time_remaining <= FINAL_SECONDS else "timer-normal"
             st.markdown(f"""
             <div class="{timer_class}">
                 ⏰ {time_display}
             </div>
             """, unsafe_allow_html=True)
             
-            # Tension sound for last 30 seconds
-            if time_remaining <= 30 and time_remaining > 0 and sound_enabled:
-                st.markdown("""
-                <audio autoplay>
-                    <source src="data:audio/wav;base64,UklGRnYBAABXQVZFZm10IBAAAAABAAEARKwAAIhYAQACABAAZGF0YVIBAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=" type="audio/wav">
-                </audio>
-                """, unsafe_allow_html=True)
+            # Tension sound for the final seconds
+            if time_remaining <= FINAL_SECONDS and time_remaining > 0 and sound_enabled:
+                st.markdown(TENSION_AUDIO, unsafe_allow_html=True)
         
-        # Show role with funny descriptions
-        role_description = get_funny_role_description(player_name == game['spy'])
+        # Show role with funny descriptions (the same on every rerun of the round)
+        role_description = get_funny_role_description(player_name == game['spy'], room_rng(game, "role"))
         
         if player_name == game['spy']:
             st.markdown(f"""
@@ -762,15 +447,7 @@ else:
             """, unsafe_allow_html=True)
             
             # All possible locations
-            all_locations = [
-                "Restaurant", "School", "Hospital", "Bank", "Airport",
-                "Beach", "Casino", "Circus", "Embassy", "Hotel",
-                "Military Base", "Movie Studio", "Museum", "Ocean Liner",
-                "Passenger Train", "Pirate Ship", "Polar Station", "Police Station",
-                "Space Station", "Submarine", "Supermarket", "Theater", "University",
-                "Library", "Zoo", "Gym", "Spa", "Bakery", "Farm", "Prison",
-                "Art Gallery", "Nightclub", "Workshop", "Cathedral", "Laboratory"
-            ]
+            all_locations = LOCATIONS
             
             # Show eliminated locations
             if st.session_state.location_guesses:
@@ -786,14 +463,14 @@ else:
                 with col1:
                     selected_location = st.selectbox("Choose a location:", remaining_locations)
                 with col2:
-                    if st.button("❌ Eliminate"):
+                    if st.button("❌ Eliminate") and allow_action('eliminate'):
                         if selected_location not in st.session_state.location_guesses:
                             st.session_state.location_guesses.append(selected_location)
-                            st.success(f"Eliminated {selected_location}!")
+                            st.toast(f"Eliminated {selected_location}!")
                             st.rerun()
                 
                 # Final guess button
-                if len(remaining_locations) <= 5:
+                if len(remaining_locations) <= room_setting(game, 'final_guess_locations'):
                     st.write("🎯 **Ready to make your final guess?**")
                     final_guess = st.selectbox("Final location guess:", remaining_locations, key="final_guess")
                     
@@ -801,9 +478,9 @@ else:
                         if guess_location(game_id, player_name, final_guess):
                             if final_guess == game['location']:
                                 end_game(game_id, "spy")
-                                st.success("🎉 CORRECT! You win!")
+                                st.toast("🎉 CORRECT! You win!")
                             else:
-                                st.error(f"❌ Wrong! The location was {game['location']}")
+                                st.toast(f"❌ Wrong! The location was {game['location']}")
                                 end_game(game_id, "non-spies")
                             st.rerun()
             else:
@@ -829,7 +506,7 @@ else:
         # Voting section
         if not game['voting_phase']:
             # Start voting button (any player can start voting)
-            if st.button("🗳️ Initiate Elimination Protocol", type="primary"):
+            if st.button("🗳️ Initiate Elimination Protocol", type="primary") and allow_action('start_voting'):
                 start_voting(game_id)
                 st.rerun()
         else:
@@ -855,20 +532,16 @@ else:
                 other_players = [p for p in game['players'].keys() if p != player_name]
                 selected_target = st.selectbox("🎯 Vote to eliminate:", other_players)
                 
-                if st.button(f"🗳️ Cast Anonymous Vote", type="primary"):
+                if st.button(f"🗳️ Cast Anonymous Vote", type="primary") and allow_action('vote'):
                     vote_player(game_id, player_name, selected_target)
-                    st.success("✅ Your anonymous vote has been cast!")
+                    st.toast("✅ Your anonymous vote has been cast!")
                     st.rerun()
             else:
                 st.info("✅ You have already cast your anonymous vote!")
             
             # Check if all players have voted
             if total_votes == total_players:
-                # Count votes by target
-                vote_counts = {}
-                for vote_data in game['votes'].values():
-                    target = vote_data['target']
-                    vote_counts[target] = vote_counts.get(target, 0) + 1
+                vote_counts = count_votes(game)
                 
                 # Show results
                 st.write("📊 **Final Vote Results:**")
@@ -876,61 +549,13 @@ else:
                     st.write(f"• **{target}**: {count} vote(s)")
                 
                 # Determine elimination
-                max_votes = max(vote_counts.values())
-                most_voted = [player for player, votes in vote_counts.items() if votes == max_votes]
-                
-                if len(most_voted) == 1:
-                    eliminated_player = most_voted[0]
-                    
-                    # Determine winner
-                    if eliminated_player == game['spy']:
-                        winner = "non-spies"
-                    else:
-                        winner = "spy"
-                    
-                    end_game(game_id, winner, eliminated_player)
-                    st.rerun()
-                else:
+                if resolve_votes(game_id, game) == "":
                     st.warning("🤝 It's a tie! No one gets eliminated. The mission continues!")
-                    # Reset voting
-                    games = get_games()
-                    games[game_id]['voting_phase'] = False
-                    games[game_id]['votes'] = {}
-                    save_games(games)
-                    st.rerun()
+                st.rerun()
         
         # Game instructions
         with st.expander("🎮 Mission Briefing & Rules"):
-            st.markdown("""
-            ### 🕵️ For the SPY:
-            - You DON'T know the location (you're lost!)
-            - Ask questions to figure out where you are
-            - Try to blend in and not get caught
-            - Use the location elimination tool to narrow down possibilities
-            - Make a final guess when you're confident
-            - Survive the vote to win!
-            
-            ### 🔍 For the DETECTIVES:
-            - You KNOW the secret location
-            - Ask questions to identify the confused spy
-            - Don't make the location too obvious in your questions
-            - Vote to eliminate the spy when you're ready
-            - Work together to catch the impostor!
-            
-            ### ⚖️ General Rules:
-            - Game lasts 5 minutes ⏰
-            - Take turns asking each other questions about the location
-            - Questions should be location-related but not too obvious
-            - Any player can start the elimination vote
-            - All votes are completely anonymous 🤐
-            - **SPY WINS:** If time runs out OR if a detective gets eliminated
-            - **DETECTIVES WIN:** If they successfully eliminate the spy
-            
-            ### 🎯 Pro Tips:
-            - Spies: Listen carefully to answers for location clues
-            - Detectives: Watch for players giving vague or confused answers
-            - Everyone: Be creative with your questions!
-            """)
+            st.markdown(RULES_MARKDOWN.format(round_length=describe_duration(room_setting(game, 'round_seconds'))))
         
         # Players in game with enhanced display
         st.markdown("""
@@ -945,16 +570,43 @@ else:
             host_badge = " 👑" if p_name == game['host'] else ""
             st.write(f"• **{p_name}**{you_badge}{host_badge}{role_hint}")
 
-# Auto-refresh functionality
-if auto_refresh and st.session_state.current_game_id:
-    time.sleep(refresh_rate)
-    st.rerun()
+# Session memory inspector. Nothing here is trimmed: per-game state belongs to
+# the game being played and track_game resets it when the next one starts
+memory_report = inspect_session(st.session_state)
+ctx = get_script_run_ctx()
+if ctx is not None:
+    get_session_registry().update(ctx.session_id, memory_report)
+with st.sidebar:
+    with st.expander("🧠 Session Memory"):
+        st.write(f"This session: **{memory_report['total_bytes'] / 1024:.1f} KB** "
+                 f"of {memory_report['budget_bytes'] / 1024:.0f} KB")
+        for key, size in list(memory_report['keys'].items())[:5]:
+            st.write(f"• `{key}`: {size / 1024:.1f} KB")
+        process_summary = get_session_registry().summary()
+        st.write(f"All sessions: {process_summary['sessions']} using "
+                 f"{process_summary['total_bytes'] / 1024:.1f} KB "
+                 f"(largest {process_summary['largest_bytes'] / 1024:.1f} KB)")
+
+# Auto-refresh functionality: how long to wait depends on what the room is doing
+if auto_refresh and refresh_target is not None:
+    refresh = next_refresh(*refresh_target, refresh_rate, st.session_state.refresh_backoff, is_host=refresh_as_host)
+    get_refresh_stats().record(refresh)
+    with st.sidebar:
+        with st.expander("🔄 Refresh Policy"):
+            if refresh.delay is None:
+                st.write(f"This page: **paused** ({refresh.reason})")
+            else:
+                backed_off = ", backed off" if refresh.backed_off else ""
+                st.write(f"This page: next refresh in **{refresh.delay:g}s** ({refresh.reason}{backed_off})")
+            refresh_summary = get_refresh_stats().summary()
+            st.write(f"All sessions: {refresh_summary['reruns_per_hour']:.0f} reruns/hour, "
+                     f"{refresh_summary['backed_off']} backed off")
+            for reason, counts in refresh_summary['reasons'].items():
+                st.write(f"• `{reason}`: {counts['count']} (mean {counts['mean_delay']:.1f}s)")
+    if refresh.delay is not None:
+        time.sleep(refresh.delay)
+        st.rerun()
 
 # Enhanced footer
 st.markdown("---")
-st.markdown("""
-<div style="text-align: center; font-style: italic; color: #666; padding: 20px;">
-    <strong>🎭 Made with ❤️ and a lot of suspicious behavior using Streamlit</strong><br>
-    <em>May the best spy win... or may the best detectives catch them! 🕵️‍♀️🔍</em>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(FOOTER_HTML, unsafe_allow_html=True)
\ No newline at end of file
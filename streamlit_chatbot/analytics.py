@@ -0,0 +1,173 @@
+"""Batch analytics over finished WhoSpies games.
+
+Streams finished games out of snapshot files (games_data.json), room event
+logs (games_data.events.jsonl) or archives with one finished room per line,
+and aggregates them chunk by chunk with pandas so memory stays bounded no
+matter how many games there are. A store's event log already contains every
+game in its snapshot, so pass one or the other, not both.
+
+    python analytics.py games_data.events.jsonl --out analytics_out
+    python analytics.py archive/*.jsonl --format parquet
+"""
+import argparse
+import json
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from game_events import GAME_ENDED, RoomEvent, apply_event, upgrade_room
+
+# Columns of the per-game table
+GAME_COLUMNS = [
+    'game_id', 'location', 'winner', 'start_time', 'end_time',
+    'players', 'votes', 'votes_for_spy',
+]
+
+# Running totals kept per location (and overall)
+TOTAL_COLUMNS = ['games', 'spy_wins', 'duration_seconds', 'timed_games', 'players', 'votes', 'votes_for_spy']
+
+
+def game_record(game_id, game):
+    """Flatten a finished room into one row"""
+    votes = game.get('votes') or {}
+    return {
+        'game_id': game_id,
+        'location': game.get('location'),
+        'winner': game.get('winner'),
+        'start_time': game.get('start_time'),
+        'end_time': game.get('end_time'),
+        'players': len(game.get('players') or {}),
+        'votes': len(votes),
+        'votes_for_spy': sum(1 for vote in votes.values() if vote['target'] == game.get('spy')),
+    }
+
+
+def _iter_snapshot(path):
+    with open(path, 'r') as f:
+        snapshot = json.load(f)
+    rooms = snapshot.get('rooms', snapshot) if isinstance(snapshot, dict) else {}
+    for game_id, game in rooms.items():
+        if game.get('game_ended'):
+            # Snapshot rooms can be from older versions (e.g. votes keyed by voter)
+            yield game_record(game_id, upgrade_room(game))
+
+
+def _iter_jsonl(path):
+    # Only rooms that are still open in the log are held in memory
+    rooms = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if 'type' not in item:
+                # Archived room
+                if item.get('game_ended'):
+                    yield game_record(item.get('game_id'), item)
+                continue
+
+            event = RoomEvent.from_dict(item)
+            previous = rooms.get(event.game_id)
+            was_ended = bool(previous and previous['game_ended'])
+            game = apply_event(previous, event)
+            if game is None:
+                rooms.pop(event.game_id, None)
+                continue
+            rooms[event.game_id] = game
+            # A second GAME_ENDED for the same game (two sessions noticing the
+            # timer, say) is logged but changes nothing
+            if event.type == GAME_ENDED and not was_ended and game['game_ended']:
+                yield game_record(event.game_id, game)
+
+
+def iter_finished_games(paths):
+    """Yield one record per finished game found in the given files"""
+    for path in paths:
+        if path.endswith(".jsonl"):
+            yield from _iter_jsonl(path)
+        else:
+            yield from _iter_snapshot(path)
+
+
+def iter_chunks(records, chunk_size=100000):
+    """Group records into DataFrames of at most chunk_size rows"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield pd.DataFrame.from_records(chunk, columns=GAME_COLUMNS)
+
+
+def chunk_totals(df):
+    """Per-location running totals for one chunk"""
+    start = pd.to_datetime(df['start_time'], errors='coerce')
+    end = pd.to_datetime(df['end_time'], errors='coerce')
+    duration = (end - start).dt.total_seconds()
+
+    totals = pd.DataFrame({
+        'location': df['location'].fillna("Unknown"),
+        'games': 1,
+        'spy_wins': (df['winner'] == "spy").astype(np.int64),
+        'duration_seconds': duration.fillna(0.0),
+        'timed_games': duration.notna().astype(np.int64),
+        'players': df['players'].astype(np.int64),
+        'votes': df['votes'].astype(np.int64),
+        'votes_for_spy': df['votes_for_spy'].astype(np.int64),
+    })
+    return totals.groupby('location')[TOTAL_COLUMNS].sum()
+
+
+def summarize(totals):
+    """Turn running totals into rates and averages"""
+    summary = pd.DataFrame(index=totals.index)
+    summary['games'] = totals['games'].astype(np.int64)
+    summary['spy_win_rate'] = totals['spy_wins'] / totals['games']
+    summary['avg_duration_seconds'] = totals['duration_seconds'] / totals['timed_games'].replace(0, np.nan)
+    summary['avg_players'] = totals['players'] / totals['games']
+    summary['vote_accuracy'] = totals['votes_for_spy'] / totals['votes'].replace(0, np.nan)
+    return summary
+
+
+def run(paths, chunk_size=100000):
+    """Aggregate every finished game; returns (overall, by_location) DataFrames"""
+    totals = pd.DataFrame(columns=TOTAL_COLUMNS, dtype=float)
+    for df in iter_chunks(iter_finished_games(paths), chunk_size):
+        totals = totals.add(chunk_totals(df), fill_value=0)
+
+    by_location = summarize(totals).sort_values('games', ascending=False)
+    by_location.index.name = 'location'
+    overall = summarize(totals.sum().to_frame('all').T)
+    overall.index.name = 'scope'
+    return overall, by_location
+
+
+def write(df, out_dir, name, fmt):
+    """Write a result table as CSV or Parquet"""
+    path = os.path.join(out_dir, f"{name}.{fmt}")
+    if fmt == "parquet":
+        df.to_parquet(path)
+    else:
+        df.to_csv(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate statistics over finished WhoSpies games")
+    parser.add_argument("paths", nargs="+", help="snapshot .json files, event logs or archives (.jsonl)")
+    parser.add_argument("--out", default="analytics_out", help="output directory")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="games per in-memory chunk")
+    args = parser.parse_args()
+
+    overall, by_location = run(args.paths, args.chunk_size)
+    os.makedirs(args.out, exist_ok=True)
+    for name, df in (("summary", overall), ("by_location", by_location)):
+        print(f"Wrote {write(df, args.out, name, args.format)}")
+    print(overall.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Append and rebuild latency of the event-sourced room store.
+
+Fills one room with thousands of events, timing each append, then opens a
+fresh store (as a new worker would) and times how long it takes to rebuild
+the room, with and without snapshots.
+
+    python benchmarks/bench_event_log.py --events 1000 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_events import PLAYER_JOINED, READY_TOGGLED, ROOM_CREATED, RoomEvent  # noqa: E402
+from game_store import SNAPSHOT_EVERY, JsonStore, SqliteStore  # noqa: E402
+
+BACKENDS = {
+    'json': (JsonStore, "games.json"),
+    'sqlite': (SqliteStore, "games.db"),
+}
+
+
+def fill_room(store, game_id, n_events):
+    """Append n_events to one room and return each append's latency in ms"""
+    store.append(RoomEvent(game_id, ROOM_CREATED))
+    for player in ("alice", "bob", "carol"):
+        store.append(RoomEvent(game_id, PLAYER_JOINED, {'player': player, 'host': player == "alice"}))
+
+    latencies = []
+    for i in range(n_events):
+        event = RoomEvent(game_id, READY_TOGGLED, {'player': ("alice", "bob", "carol")[i % 3]})
+        start = time.perf_counter()
+        store.append(event)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def time_rebuild(store_cls, path, game_id, snapshot_every):
+    """Open the store cold and time loading the room, in ms"""
+    start = time.perf_counter()
+    store = store_cls(path, snapshot_every=snapshot_every)
+    store.load(game_id)
+    elapsed = (time.perf_counter() - start) * 1000
+    store.close()
+    return elapsed
+
+
+def run(backend, n_events, snapshot_every):
+    store_cls, filename = BACKENDS[backend]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, filename)
+        store = store_cls(path, snapshot_every=snapshot_every)
+        latencies = fill_room(store, "BENCH1", n_events)
+        # Don't let close() snapshot the JSON store; we want the log tail
+        store.close(checkpoint=False)
+        rebuild_ms = time_rebuild(store_cls, path, "BENCH1", snapshot_every)
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'events': n_events,
+        'snapshot_every': snapshot_every,
+        'append_mean_ms': statistics.mean(latencies),
+        'append_p99_ms': latencies[int(len(latencies) * 0.99) - 1],
+        'rebuild_ms': rebuild_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'events':>7} {'snapshot':>9} {'append mean':>12} {'append p99':>11} {'rebuild':>10}")
+    for backend in args.backends:
+        for n_events in args.events:
+            # Default snapshot cadence vs. effectively no snapshots
+            for snapshot_every in (SNAPSHOT_EVERY, n_events * 10):
+                r = run(backend, n_events, snapshot_every)
+                snapshot = str(snapshot_every) if snapshot_every == SNAPSHOT_EVERY else "never"
+                print(f"{r['backend']:<8} {r['events']:>7} {snapshot:>9} "
+                      f"{r['append_mean_ms']:>10.3f}ms {r['append_p99_ms']:>9.3f}ms {r['rebuild_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
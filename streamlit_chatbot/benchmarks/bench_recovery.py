@@ -0,0 +1,110 @@
+"""JSON store recovery time against journal length, and reads during checkpoints.
+
+Writes --events events across --rooms rooms without checkpointing, "crashes"
+(closes without a snapshot, leaving a torn last line), and times how long a
+fresh JsonStore takes to recover. Then fills a large store and measures read
+latency while checkpoints run in the background.
+
+    python benchmarks/bench_recovery.py --events 1000 10000 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_events import PLAYER_JOINED, READY_TOGGLED, ROOM_CREATED, RoomEvent  # noqa: E402
+from game_store import SNAPSHOT_EVERY, JsonStore  # noqa: E402
+
+BATCH = 1000
+
+
+def fill(store, n_rooms, n_events):
+    """Append n_events spread over n_rooms, in batches"""
+    rooms = [f"R{i:05d}" for i in range(n_rooms)]
+    events = [RoomEvent(game_id, ROOM_CREATED) for game_id in rooms]
+    events += [RoomEvent(game_id, PLAYER_JOINED, {'player': "host", 'host': True}) for game_id in rooms]
+    while len(events) < n_events:
+        events.append(RoomEvent(rooms[len(events) % n_rooms], READY_TOGGLED, {'player': "host"}))
+    for start in range(0, len(events), BATCH):
+        store.append_many(events[start:start + BATCH])
+    return rooms
+
+
+def recovery_ms(n_rooms, n_events):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.json")
+        store = JsonStore(path, snapshot_every=n_events * 10)
+        fill(store, n_rooms, n_events)
+        store.close(checkpoint=False)
+        with open(store.log_path, 'ab') as f:
+            f.write(b'{"game_id": "R00000", "type": "ready_tog')
+
+        start = time.perf_counter()
+        recovered = JsonStore(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        recovered.close(checkpoint=False)
+        return elapsed, os.path.getsize(store.log_path)
+
+
+def reads_during_checkpoints(n_rooms, n_events, duration):
+    """Read latencies (ms) while appends keep triggering checkpoints"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JsonStore(os.path.join(tmp, "games.json"), snapshot_every=SNAPSHOT_EVERY)
+        rooms = fill(store, n_rooms, n_events)
+        # What a read would have waited if the checkpoint held the store's lock
+        start = time.perf_counter()
+        store.checkpoint()
+        checkpoint_ms = (time.perf_counter() - start) * 1000
+        stop = time.monotonic() + duration
+        checkpoints = 0
+
+        def writer():
+            nonlocal checkpoints
+            i = 0
+            while time.monotonic() < stop:
+                store.append_many([RoomEvent(rooms[(i + j) % n_rooms], READY_TOGGLED, {'player': "host"})
+                                   for j in range(SNAPSHOT_EVERY)])
+                checkpoints += 1
+                i += SNAPSHOT_EVERY
+                time.sleep(0.01)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        latencies, i = [], 0
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            store.load(rooms[i % n_rooms])
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += 1
+        thread.join()
+        store.close(checkpoint=False)
+    latencies.sort()
+    return latencies, checkpoints, checkpoint_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=5, help="seconds of reads during checkpoints")
+    args = parser.parse_args()
+
+    print(f"{'journal events':>15} {'journal size':>13} {'recovery':>10}")
+    for n_events in args.events:
+        elapsed, size = recovery_ms(args.rooms, n_events)
+        print(f"{n_events:>15} {size / 2**20:>11.1f}MB {elapsed:>8.1f}ms")
+
+    latencies, checkpoints, checkpoint_ms = reads_during_checkpoints(args.rooms * 4, max(args.events), args.duration)
+    print(f"one checkpoint of {args.rooms * 4} rooms takes {checkpoint_ms:.1f}ms")
+    print(f"reads during ~{checkpoints} checkpoints of {args.rooms * 4} rooms: "
+          f"median {statistics.median(latencies):.3f}ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}ms, "
+          f"max {latencies[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
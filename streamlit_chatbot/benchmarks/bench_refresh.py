@@ -0,0 +1,147 @@
+"""Page reruns per hour with a fixed refresh rate versus the adaptive policy.
+
+Plays an hour of back-to-back games in rooms of each --room-sizes, with
+players joining and readying up in the lobby, a vote part way through most
+rounds (the rest run out the clock) and an idle spell before the host starts
+the next one. Every player's page is then replayed against that timeline,
+once rerunning every --rate seconds and once asking refresh_policy when to
+rerun (the host's page stops on an ended game until they click "Start New
+Mission"). Reports reruns per hour per player and for
+--players concurrent players, how late pages notice a phase change, and
+the adaptive policy's decisions by reason.
+
+    python benchmarks/bench_refresh.py
+    python benchmarks/bench_refresh.py --room-sizes 3 5 8 --players 30 300 --rate 2
+"""
+import argparse
+import bisect
+import os
+import random
+import statistics
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from refresh_policy import RefreshBackoff, next_refresh  # noqa: E402
+
+EPOCH = datetime(2024, 1, 1)
+
+
+class Room:
+    """Back-to-back games in one room, as phase times and event times"""
+
+    def __init__(self, size, rng, args):
+        self.size = size
+        self.settings = {'round_seconds': args.round_seconds}
+        self.games, self.events, self.changes = [], [], []
+        joins = sorted(rng.uniform(0, args.lobby_seconds / 2) for _ in range(size))
+        t = 0.0
+        while t < args.hours * 3600:
+            first = not self.games
+            arrived = joins if first else [t] * size
+            readies = [rng.uniform(a, t + args.lobby_seconds) for a in arrived]
+            start = t + args.lobby_seconds
+            if rng.random() < args.vote_share:
+                voting = start + rng.uniform(0.3, 0.9) * args.round_seconds
+                votes = sorted(voting + rng.uniform(2, 30) for _ in range(size))
+                end = votes[-1]
+            else:
+                voting, votes, end = None, [], start + args.round_seconds
+            restart = end + args.idle_seconds
+            self.games.append({
+                'lobby': t, 'arrived': arrived, 'readies': readies, 'start': start,
+                'voting': voting, 'votes': votes, 'end': end, 'restart': restart,
+            })
+            self.events += (joins if first else []) + readies + [start] + ([voting] if voting else []) + votes + [end]
+            self.changes += [start] + ([voting] if voting else []) + [end, restart]
+            t = restart
+        self.events.sort()
+        self.starts = [g['lobby'] for g in self.games]
+
+    def at(self, t):
+        """(game record, version, the game's timeline) at t seconds"""
+        game = self.games[bisect.bisect_right(self.starts, t) - 1]
+        record = {
+            'players': [i for i, a in enumerate(game['arrived']) if a <= t],
+            'game_started': t >= game['start'],
+            'voting_phase': game['voting'] is not None and t >= game['voting'],
+            'game_ended': t >= game['end'],
+            'start_time': (EPOCH + timedelta(seconds=game['start'])).isoformat(),
+            'settings': self.settings,
+        }
+        return record, bisect.bisect_right(self.events, t), game
+
+
+def replay(room, player, args, adaptive, reasons):
+    """Rerun times of one player's page over the run"""
+    horizon = args.hours * 3600
+    t = room.games[0]['arrived'][player]
+    backoff = RefreshBackoff()
+    runs = []
+    while t < horizon:
+        runs.append(t)
+        if not adaptive:
+            t += args.rate
+            continue
+        record, version, game = room.at(t)
+        decision = next_refresh("ROOM", record, version, args.rate, backoff,
+                                 is_host=(player == 0), now=EPOCH + timedelta(seconds=t))
+        reasons[decision.reason] += 1
+        if decision.delay is not None:
+            t += decision.delay
+        else:
+            t = game['restart']  # the host clicks "Start New Mission"
+    return runs
+
+
+def notice_lags(room, runs):
+    """Seconds from each phase change to the page's next run"""
+    lags = []
+    for change in room.changes:
+        i = bisect.bisect_left(runs, change)
+        if i < len(runs) and change >= runs[0]:
+            lags.append(runs[i] - change)
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--room-sizes", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--players", type=int, nargs="+", default=[30, 300], help="concurrent players to total for")
+    parser.add_argument("--rate", type=float, default=2, help="the player's refresh rate in seconds")
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--round-seconds", type=float, default=300)
+    parser.add_argument("--lobby-seconds", type=float, default=60)
+    parser.add_argument("--idle-seconds", type=float, default=45, help="from game over to the host's restart")
+    parser.add_argument("--vote-share", type=float, default=0.7, help="rounds that end in a vote")
+    parser.add_argument("--rooms", type=int, default=20, help="rooms simulated per size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    header = f"{'size':>5} {'policy':>9} {'reruns/h/player':>16} {'mean lag':>9} {'p95 lag':>8}"
+    header += "".join(f" {f'@{n} players':>14}" for n in args.players)
+    print(header)
+    for size in args.room_sizes:
+        rng = random.Random(args.seed)
+        rooms = [Room(size, rng, args) for _ in range(args.rooms)]
+        reasons = Counter()
+        for policy, adaptive in (("fixed", False), ("adaptive", True)):
+            reruns, lags = 0, []
+            for room in rooms:
+                for player in range(size):
+                    runs = replay(room, player, args, adaptive, reasons)
+                    reruns += len(runs)
+                    lags += notice_lags(room, runs)
+            per_player = reruns / (len(rooms) * size) / args.hours
+            p95 = statistics.quantiles(lags, n=20)[-1] if len(lags) > 1 else 0.0
+            line = f"{size:>5} {policy:>9} {per_player:>16.0f} {statistics.mean(lags):>8.2f}s {p95:>7.2f}s"
+            line += "".join(f" {per_player * n:>14,.0f}" for n in args.players)
+            print(line)
+        total = sum(reasons.values())
+        print("      decisions: " + ", ".join(f"{r} {c / total:.0%}" for r, c in reasons.most_common()))
+
+
+if __name__ == "__main__":
+    main()
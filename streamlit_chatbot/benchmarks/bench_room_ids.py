@@ -0,0 +1,55 @@
+"""Room creation latency as the number of rooms grows.
+
+Creates rooms through game_engine.create_new_game against a fresh SQLite
+store and reports latency per batch plus how many generated IDs collided.
+
+    python benchmarks/bench_room_ids.py --rooms 200000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=20000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["WHOSPIES_STORE"] = "sqlite"
+    os.environ["WHOSPIES_DB"] = os.path.join(tmp, "games.db")
+
+    import game_engine
+
+    generated = 0
+    generate_game_id = game_engine.generate_game_id
+
+    def counting_generate_game_id():
+        nonlocal generated
+        generated += 1
+        return generate_game_id()
+
+    game_engine.generate_game_id = counting_generate_game_id
+
+    print(f"{'rooms':>8} {'mean':>9} {'p99':>9} {'collisions':>11}")
+    created = 0
+    while created < args.rooms:
+        latencies = []
+        for _ in range(min(args.batch, args.rooms - created)):
+            start = time.perf_counter()
+            game_engine.create_new_game()
+            latencies.append((time.perf_counter() - start) * 1000)
+        created += len(latencies)
+        latencies.sort()
+        print(f"{created:>8} {statistics.mean(latencies):>7.3f}ms "
+              f"{latencies[int(len(latencies) * 0.99) - 1]:>7.3f}ms {generated - created:>11}")
+
+
+if __name__ == "__main__":
+    main()
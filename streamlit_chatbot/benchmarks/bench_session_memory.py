@@ -0,0 +1,121 @@
+"""Session memory across many consecutive games in one session.
+
+Drives WhoSpies.py through Streamlit's AppTest for --games games in one
+room: the session creates the room, readies up, launches every mission,
+crosses off locations whenever it's the spy and starts the next mission
+from the results page, while two bots play the other seats. It samples
+that session's footprint (`inspect_session` of its session_state) and the
+process's live object count (tracemalloc would slow the page down about
+4x), and exits non-zero if either keeps growing or if
+a new mission starts with the last one's guesses. --no-reset stubs out the
+page's per-game reset to show that failure.
+
+    python benchmarks/bench_session_memory.py --games 1000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Locations the session crosses off whenever it's the spy
+ELIMINATIONS = 3
+
+
+def click(app, label, required=True):
+    """Click the first button whose label starts with label, and rerun; False if there's none"""
+    for button in app.button:
+        if button.label.startswith(label):
+            button.click().run()
+            if app.exception:
+                raise RuntimeError(f"Page failed after clicking {label!r}: {app.exception}")
+            return True
+    if required:
+        raise RuntimeError(f"No {label!r} button; buttons are {[b.label for b in app.button]}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--tolerance", type=int, default=16 * 1024, help="allowed session growth in bytes")
+    parser.add_argument("--object-tolerance", type=int, default=2000, help="allowed growth in live objects")
+    parser.add_argument("--no-reset", action="store_true", help="skip track_game (the old behaviour)")
+    args = parser.parse_args()
+
+    os.environ["WHOSPIES_GAMES_FILE"] = os.path.join(tempfile.mkdtemp(), "games.json")
+    os.environ.setdefault("WHOSPIES_FSYNC", "0")
+
+    import game_engine
+    import game_store
+    import session_memory
+    from rate_limit import ActionRateLimiter
+    from session_memory import inspect_session
+    from streamlit.testing.v1 import AppTest
+
+    # The store's change feed is bounded but shared by the whole process;
+    # keep it short so it fills during warm-up and doesn't look like a leak
+    game_store.CHANGE_FEED_LENGTH = 100
+    if args.no_reset:
+        # The page imports it on every run, so this takes effect there
+        session_memory.track_game = lambda state, game_id, game: None
+
+    app = AppTest.from_file(os.path.join(APP_DIR, "WhoSpies.py"), default_timeout=60)
+    app.run()
+    # Auto-refresh would keep a live game rerunning forever; this script clicks instead.
+    # It also clicks far faster than a person, so lift the rate limit.
+    app.sidebar.checkbox[0].uncheck()
+    app.session_state['rate_limiter'] = ActionRateLimiter(rate=1e9, burst=1e9)
+    app.text_input(key="create_name").input("agent")
+    click(app, "🚀 Create Game")
+    game_id = app.session_state['current_game_id']
+    for name in ("bot-1", "bot-2"):
+        game_engine.join_game(game_id, name)
+    app.run()
+
+    samples = []
+    every = max(1, args.games // args.samples)
+    for i in range(1, args.games + 1):
+        # The page is on the briefing room, from the last "Start New Mission"
+        for name in ("bot-1", "bot-2"):
+            game_engine.toggle_ready(game_id, name)
+        click(app, "⏳ Still Preparing")
+        click(app, "🚀 Launch Mission")
+        if game_store.get_store().load(game_id)['spy'] == "agent":
+            for _ in range(ELIMINATIONS):
+                if not click(app, "❌ Eliminate", required=False):
+                    break  # Nothing left to cross off
+        game_engine.end_game(game_id, "spy")
+        app.run()
+        click(app, "🔄 Start New Mission")
+        carried_over = app.session_state['location_guesses']
+        if carried_over:
+            print(f"FAIL: game {i} started with the last game's guesses {carried_over}")
+            sys.exit(1)
+
+        if i % every == 0 or i == 1:
+            # Streamlit leaves garbage cycles behind on every run; don't count them
+            gc.collect()
+            session_bytes = inspect_session(app.session_state)['total_bytes']
+            objects = len(gc.get_objects())
+            samples.append((i, session_bytes, objects))
+            print(f"game {i:>6}: session {session_bytes / 1024:8.1f} KB   live objects {objects:>9,}")
+
+    # Compare against the first sample after warm-up
+    _, first_session, first_objects = samples[1] if len(samples) > 2 else samples[0]
+    _, last_session, last_objects = samples[-1]
+    session_growth = last_session - first_session
+    object_growth = last_objects - first_objects
+    print(f"growth: session {session_growth / 1024:+.1f} KB, live objects {object_growth:+,}")
+    if session_growth > args.tolerance or object_growth > args.object_tolerance:
+        print("FAIL: memory keeps growing across games")
+        sys.exit(1)
+    print("OK: memory is flat across games")
+
+
+if __name__ == "__main__":
+    main()
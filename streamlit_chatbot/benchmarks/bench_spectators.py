@@ -0,0 +1,83 @@
+"""Storage reads and CPU per spectator page view as viewers grow.
+
+Runs one SQLite-backed room through a game while --viewers spectators each
+poll it every --poll seconds, first the way a player page does (every viewer
+loads the room) and then through the shared SpectatorCache. Reports store
+queries and CPU time per view for both.
+
+    python benchmarks/bench_spectators.py --viewers 10 100 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--ticks", type=int, default=20, help="polls per viewer")
+    parser.add_argument("--poll", type=float, default=0.1, help="seconds between polls")
+    args = parser.parse_args()
+
+    os.environ["WHOSPIES_STORE"] = "sqlite"
+    os.environ["WHOSPIES_DB"] = os.path.join(tempfile.mkdtemp(), "games.db")
+
+    import game_engine
+    from game_events import get_event_bus
+    from game_store import get_store
+    from spectator import SpectatorCache, redact
+
+    store = get_store()
+    queries = 0
+
+    def count_query(_):
+        nonlocal queries
+        queries += 1
+
+    store._conn().set_trace_callback(count_query)
+
+    def play(game_id, tick):
+        # Something happens in the room every few ticks
+        if tick == 2:
+            game_engine.start_game(game_id)
+        elif tick == 8:
+            game_engine.start_voting(game_id)
+        elif tick == 12:
+            game_engine.end_game(game_id, "spy")
+
+    def naive(game_id, viewers):
+        for _ in range(viewers):
+            game, version = store.load_versioned(game_id)
+            redact(game_id, game, version)
+
+    def cached(cache):
+        return lambda game_id, viewers: [cache.get(game_id) for _ in range(viewers)]
+
+    print(f"{'viewers':>8} {'mode':>7} {'queries/view':>13} {'cpu/view':>10}")
+    for viewers in args.viewers:
+        modes = (("naive", naive), ("cached", cached(SpectatorCache(get_event_bus(), store, ttl=1.0))))
+        for mode, view in modes:
+            game_id = game_engine.create_new_game(seed=viewers)
+            for name in ("host", "bot-1", "bot-2"):
+                game_engine.join_game(game_id, name, is_host=(name == "host"))
+
+            queries, cpu = 0, 0.0
+            for tick in range(args.ticks):
+                writes = queries
+                play(game_id, tick)
+                queries = writes  # don't count the players' own writes
+                start = time.process_time()
+                view(game_id, viewers)
+                cpu += time.process_time() - start
+                time.sleep(args.poll)
+
+            views = viewers * args.ticks
+            print(f"{viewers:>8} {mode:>7} {queries / views:>13.3f} {cpu / views * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
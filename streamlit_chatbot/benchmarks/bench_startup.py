@@ -0,0 +1,78 @@
+"""Cold start and rerun cost of the Streamlit pages.
+
+For each page, runs it once in a fresh interpreter under `python -X importtime`
+and reports total import time and the slowest top-level imports, then times
+the first run and later reruns through Streamlit's AppTest.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --pages chatbot.py --reruns 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a page outside of `streamlit run`, which is enough to trigger its imports
+RUN_PAGE = "import runpy, sys; sys.path.insert(0, {dir!r}); runpy.run_path({path!r}, run_name='__main__')"
+
+
+def import_times(path):
+    """(total_ms, [(cumulative_ms, module)]) for top-level imports of one page"""
+    env = dict(os.environ, WHOSPIES_GAMES_FILE=os.path.join(tempfile.mkdtemp(), "games.json"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN_PAGE.format(dir=APP_DIR, path=path)],
+        capture_output=True, text=True, env=env, cwd=APP_DIR,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented under the module that pulled them in
+        if not name.startswith("  "):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sum(ms for ms, _ in modules), sorted(modules, reverse=True)
+
+
+def run_times(path, reruns):
+    """(first_run_ms, mean_rerun_ms) of a page through AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["WHOSPIES_GAMES_FILE"] = os.path.join(tempfile.mkdtemp(), "games.json")
+    app = AppTest.from_file(path, default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first = (time.perf_counter() - start) * 1000
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        times.append((time.perf_counter() - start) * 1000)
+    return first, statistics.mean(times) if times else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=["chatbot.py", "WhoSpies.py"])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to list")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    for page in args.pages:
+        path = os.path.join(APP_DIR, page)
+        total, modules = import_times(path)
+        print(f"{page}: imports {total:.0f}ms")
+        for ms, name in modules[:args.top]:
+            print(f"    {ms:8.1f}ms  {name}")
+        first, rerun = run_times(path, args.reruns)
+        print(f"    first run {first:.1f}ms, rerun {rerun:.1f}ms (mean of {args.reruns})")
+
+
+if __name__ == "__main__":
+    main()
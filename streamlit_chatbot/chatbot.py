@@ -1,11 +1,22 @@
 import streamlit as st
-import pandas as pd
+
+from session_memory import enforce_budget
+
+# Oldest messages are dropped beyond this (or when the session gets too big)
+MAX_MESSAGES = 200
 
 
 def initialize_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+def trim_history():
+    """Keep the conversation within MAX_MESSAGES and the session budget"""
+    messages = st.session_state.messages
+    if len(messages) > MAX_MESSAGES:
+        del messages[:len(messages) - MAX_MESSAGES]
+    enforce_budget(st.session_state, ["messages"])
+
 def main():
     st.title("Simple Chatbot")
     
@@ -31,22 +42,23 @@ def main():
             st.write(response)
         
         st.session_state.messages.append({"role": "assistant", "content": response})
+        trim_history()
 
 if __name__ == "__main__":
     main()
 
-df = pd.DataFrame({
+data = {
     'Month': ['January', 'February', 'March', 'January'],
     'Price': [1000, 1500, 2000, 1200]
-})
+}
 
 # Add sidebar
 st.sidebar.header("Filters")
 
-# Add dropdown
+# Add dropdown (each month once, in order)
 selected_month = st.sidebar.selectbox(
     "Select Month",
-    options=df['Month'].unique()
+    options=list(dict.fromkeys(data['Month']))
 )
 
 # Add slider
@@ -55,4 +67,4 @@ price_range = st.sidebar.slider(
     min_value=0,
     max_value=3000,
     value=(0, 3000)
-)
\ No newline at end of file
+)
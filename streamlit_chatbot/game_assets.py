@@ -0,0 +1,305 @@
+"""Static page content for WhoSpies.
+
+The stylesheet, sounds, fixed HTML and message pools live here rather than in
+WhoSpies.py, which Streamlit re-executes from the top on every rerun; a module
+is imported once per process, so none of this is rebuilt per rerun.
+"""
+import random
+
+PAGE_CSS = """
+<style>
+@import url('https://fonts.googleapis.com/css2?family=Creepster&family=Righteous:wght@400&display=swap');
+
+.main-title {
+    font-family: 'Creepster', cursive;
+    font-size: 4rem;
+    text-align: center;
+    background: linear-gradient(45deg, #ff6b6b, #4ecdc4, #45b7d1, #96ceb4, #ffeaa7);
+    background-size: 300% 300%;
+    -webkit-background-clip: text;
+    -webkit-text-fill-color: transparent;
+    animation: gradient-shift 3s ease-in-out infinite;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+    margin-bottom: 10px;
+}
+
+.subtitle {
+    font-family: 'Righteous', cursive;
+    font-size: 1.5rem;
+    text-align: center;
+    color: #666;
+    font-style: italic;
+    margin-bottom: 30px;
+}
+
+@keyframes gradient-shift {
+    0% { background-position: 0% 50%; }
+    50% { background-position: 100% 50%; }
+    100% { background-position: 0% 50%; }
+}
+
+.timer-normal {
+    font-size: 2.5rem;
+    font-weight: bold;
+    color: #0066cc;
+    text-align: center;
+    padding: 15px;
+    border: 3px solid #0066cc;
+    border-radius: 15px;
+    margin: 15px 0;
+    background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+    box-shadow: 0 4px 15px rgba(0,102,204,0.3);
+}
+
+.timer-danger {
+    font-size: 2.5rem;
+    font-weight: bold;
+    color: #ff0000;
+    text-align: center;
+    padding: 15px;
+    border: 3px solid #ff0000;
+    border-radius: 15px;
+    margin: 15px 0;
+    background: linear-gradient(135deg, #ffefef 0%, #ffcccc 100%);
+    animation: pulse-danger 1s infinite;
+    box-shadow: 0 4px 15px rgba(255,0,0,0.4);
+}
+
+@keyframes pulse-danger {
+    0% { opacity: 1; transform: scale(1); }
+    50% { opacity: 0.7; transform: scale(1.05); }
+    100% { opacity: 1; transform: scale(1); }
+}
+
+.winner-announcement {
+    font-size: 3rem;
+    font-weight: bold;
+    text-align: center;
+    padding: 30px;
+    border-radius: 20px;
+    margin: 30px 0;
+    animation: celebrate 2s ease-in-out;
+    box-shadow: 0 8px 25px rgba(0,0,0,0.2);
+}
+
+.spy-wins {
+    background: linear-gradient(45deg, #ff6b6b, #ff8e8e);
+    color: white;
+}
+
+.non-spy-wins {
+    background: linear-gradient(45deg, #4ecdc4, #44a08d);
+    color: white;
+}
+
+@keyframes celebrate {
+    0% { transform: scale(0.5) rotate(-180deg); opacity: 0; }
+    50% { transform: scale(1.1) rotate(0deg); }
+    100% { transform: scale(1) rotate(0deg); opacity: 1; }
+}
+
+.vote-section {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    padding: 20px;
+    border-radius: 15px;
+    margin: 15px 0;
+    box-shadow: 0 6px 20px rgba(102,126,234,0.3);
+}
+
+.role-card {
+    padding: 20px;
+    border-radius: 15px;
+    margin: 15px 0;
+    text-align: center;
+    font-size: 1.2rem;
+    font-weight: bold;
+    box-shadow: 0 6px 20px rgba(0,0,0,0.1);
+    animation: role-reveal 1s ease-out;
+}
+
+.spy-card {
+    background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
+    color: white;
+    border: 3px solid #d63031;
+}
+
+.non-spy-card {
+    background: linear-gradient(135deg, #00b894 0%, #00a085 100%);
+    color: white;
+    border: 3px solid #00b894;
+}
+
+@keyframes role-reveal {
+    0% { opacity: 0; transform: translateY(-20px); }
+    100% { opacity: 1; transform: translateY(0); }
+}
+
+.location-guess-section {
+    background: linear-gradient(135deg, #fda085 0%, #f093fb 100%);
+    padding: 20px;
+    border-radius: 15px;
+    margin: 15px 0;
+    color: white;
+    box-shadow: 0 6px 20px rgba(253,160,133,0.3);
+}
+
+.game-over-message {
+    font-size: 1.5rem;
+    text-align: center;
+    padding: 20px;
+    margin: 20px 0;
+    border-radius: 15px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    animation: message-bounce 1s ease-out;
+}
+
+@keyframes message-bounce {
+    0% { transform: translateY(-30px); opacity: 0; }
+    50% { transform: translateY(5px); }
+    100% { transform: translateY(0); opacity: 1; }
+}
+
+.player-list {
+    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+    padding: 15px;
+    border-radius: 10px;
+    margin: 10px 0;
+    color: white;
+}
+
+/* Button enhancements */
+.stButton > button {
+    border-radius: 10px !important;
+    font-weight: bold !important;
+    transition: all 0.3s ease !important;
+}
+
+.stButton > button:hover {
+    transform: translateY(-2px) !important;
+    box-shadow: 0 4px 15px rgba(0,0,0,0.2) !important;
+}
+</style>
+"""
+
+BACKGROUND_AUDIO = """
+<audio autoplay loop>
+    <source src="data:audio/wav;base64,UklGRnYBAABXQVZFZm10IBAAAAABAAEARKwAAIhYAQACABAAZGF0YVIBAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=" type="audio/wav">
+</audio>
+"""
+
+# Played during the last 30 seconds
+TENSION_AUDIO = """
+<audio autoplay>
+    <source src="data:audio/wav;base64,UklGRnYBAABXQVZFZm10IBAAAAABAAEARKwAAIhYAQACABAAZGF0YVIBAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=" type="audio/wav">
+</audio>
+
+"""
+
+TITLE_HTML = """
+<div class="main-title">
+    🕵️ WHOSPIES? 🕵️
+</div>
+<div class="subtitle">
+    The Ultimate Social Deduction Game of Secrets, Lies, and Questionable Acting Skills!
+</div>
+"""
+
+RULES_MARKDOWN = """
+### 🕵️ For the SPY:
+- You DON'T know the location (you're lost!)
+- Ask questions to figure out where you are
+- Try to blend in and not get caught
+- Use the location elimination tool to narrow down possibilities
+- Make a final guess when you're confident
+- Survive the vote to win!
+
+### 🔍 For the DETECTIVES:
+- You KNOW the secret location
+- Ask questions to identify the confused spy
+- Don't make the location too obvious in your questions
+- Vote to eliminate the spy when you're ready
+- Work together to catch the impostor!
+
+### ⚖️ General Rules:
+- Game lasts {round_length} ⏰
+- Take turns asking each other questions about the location
+- Questions should be location-related but not too obvious
+- Any player can start the elimination vote
+- All votes are completely anonymous 🤐
+- **SPY WINS:** If time runs out OR if a detective gets eliminated
+- **DETECTIVES WIN:** If they successfully eliminate the spy
+
+### 🎯 Pro Tips:
+- Spies: Listen carefully to answers for location clues
+- Detectives: Watch for players giving vague or confused answers
+- Everyone: Be creative with your questions!
+"""
+
+FOOTER_HTML = """
+<div style="text-align: center; font-style: italic; color: #666; padding: 20px;">
+    <strong>🎭 Made with ❤️ and a lot of suspicious behavior using Streamlit</strong><br>
+    <em>May the best spy win... or may the best detectives catch them! 🕵️‍♀️🔍</em>
+</div>
+"""
+
+
+def describe_duration(seconds):
+    """Say a round length in words, like '5 minutes' or '90 seconds'"""
+    if seconds >= 60 and seconds % 60 == 0:
+        minutes = int(seconds // 60)
+        return f"{minutes} minute{'s' if minutes != 1 else ''}"
+    return f"{seconds:g} seconds"
+
+
+def format_time(seconds):
+    """Format seconds into MM:SS"""
+    minutes = int(seconds // 60)
+    seconds = int(seconds % 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def get_funny_role_description(is_spy, rng=random):
+    """Get funny role descriptions"""
+    if is_spy:
+        descriptions = [
+            "🕵️ You're the SPY! Time to channel your inner 007... or Mr. Bean!",
+            "🕵️ CONGRATULATIONS! You're officially lost and confused!",
+            "🕵️ You're the SPY! Your mission: Figure out where you are without looking like a tourist!",
+            "🕵️ SPY ALERT! You're about as undercover as a giraffe in a zoo!",
+            "🕵️ You're the SPY! Try not to ask 'Where am I?' directly... that's a dead giveaway!"
+        ]
+    else:
+        descriptions = [
+            "👥 You're NOT the spy! Time to play detective and catch that sneaky impostor!",
+            "👥 Congrats! You actually know where you are (shocking, we know)!",
+            "👥 You're a REGULAR PERSON! Your job: Spot the clueless spy among you!",
+            "👥 NOT A SPY! Now go catch that suspicious person asking weird questions!",
+            "👥 You're in the clear! Time to hunt down the person who clearly doesn't belong!"
+        ]
+    return rng.choice(descriptions)
+
+
+def get_funny_game_over_message(winner, spy_name, location, eliminated_player=None, rng=random):
+    """Get funny game over messages"""
+    if winner == "spy":
+        messages = [
+            f"🎉 {spy_name} pulls off the ultimate bamboozle! The spy wins by being sneakier than a cat burglar!",
+            f"🕵️ PLOT TWIST! {spy_name} was the spy all along and fooled everyone! Master of disguise or just lucky?",
+            f"🎭 {spy_name} deserves an Oscar for that performance! The spy wins by pure deception!",
+            f"🤡 Everyone got played by {spy_name}! The spy wins and probably can't stop laughing!",
+            f"🎪 Ladies and gentlemen, {spy_name} just pulled off the heist of the century... of confusion!"
+        ]
+        if eliminated_player:
+            messages.append(f"💀 Poor {eliminated_player} got voted out while {spy_name} was laughing in the shadows!")
+    else:
+        messages = [
+            f"🔍 BUSTED! {spy_name} got caught red-handed! The detectives win this round!",
+            f"👮 Justice is served! {spy_name}'s cover was blown harder than a birthday candle!",
+            f"🎯 GOTCHA! {spy_name} was about as subtle as a bull in a china shop!",
+            f"🕵️‍♀️ Case closed! {spy_name} should probably stick to their day job!",
+            f"🏆 The good guys win! {spy_name} got exposed faster than a bad lie!"
+        ]
+    
+    return rng.choice(messages)
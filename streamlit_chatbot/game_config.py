@@ -0,0 +1,111 @@
+"""Game settings for WhoSpies, from a JSON file and the environment.
+
+Settings come from DEFAULTS, then the JSON file at WHOSPIES_CONFIG (if it
+exists), then WHOSPIES_<NAME> environment variables, e.g.
+
+    WHOSPIES_CONFIG=/srv/whospies/config.json streamlit run WhoSpies.py
+    WHOSPIES_ROUND_SECONDS=180 WHOSPIES_REFRESH_SECONDS=3 streamlit run WhoSpies.py
+
+They are validated and read once per process (`get_config`), so a bad value
+fails at startup rather than mid-game. The ROOM_SETTINGS can also be set per
+room: the overrides are stored in the room record when it's created, and
+`room_setting` prefers them over the process-wide value.
+"""
+import json
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.environ.get("WHOSPIES_CONFIG", os.path.join(BASE_DIR, "whospies_config.json"))
+
+DEFAULTS = {
+    'round_seconds': 300,
+    'min_players': 3,
+    'final_guess_locations': 5,  # the spy may guess once this few locations are left
+    'refresh_seconds': 2,
+    'refresh_min_seconds': 1,
+    'refresh_max_seconds': 5,
+    'full_lobby_players': 8,  # lobbies this big poll at refresh_max_seconds
+}
+
+# Type and smallest allowed value of each setting
+_SPEC = {
+    'round_seconds': (float, 1),
+    'min_players': (int, 3),
+    'final_guess_locations': (int, 1),
+    'refresh_seconds': (int, 1),
+    'refresh_min_seconds': (int, 1),
+    'refresh_max_seconds': (int, 1),
+    'full_lobby_players': (int, 3),
+}
+
+# Settings a room may override in its own record; a room's refresh_seconds
+# is the fastest its pages poll, whatever the player picks
+ROOM_SETTINGS = ('round_seconds', 'min_players', 'final_guess_locations', 'refresh_seconds')
+
+
+def _validate(name, value):
+    if name not in _SPEC:
+        raise ValueError(f"Unknown WhoSpies setting: {name!r}")
+    kind, minimum = _SPEC[name]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"WhoSpies setting {name} must be a number, got {value!r}") from None
+    if kind is int and not number.is_integer():
+        raise ValueError(f"WhoSpies setting {name} must be a whole number, got {value!r}")
+    if number < minimum:
+        raise ValueError(f"WhoSpies setting {name} must be at least {minimum}, got {value!r}")
+    return int(number) if kind is int or number.is_integer() else number
+
+
+def validate_room_settings(settings):
+    """Check per-room overrides; returns them cleaned up"""
+    unknown = set(settings) - set(ROOM_SETTINGS)
+    if unknown:
+        raise ValueError(f"Settings that can't be set per room: {', '.join(sorted(unknown))}")
+    return {name: _validate(name, value) for name, value in settings.items()}
+
+
+def load_config(path=CONFIG_FILE, environ=os.environ):
+    """Read and validate settings from the file and environment (uncached)"""
+    config = dict(DEFAULTS)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            try:
+                from_file = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Config file {path} is not valid JSON: {e}") from None
+        if not isinstance(from_file, dict):
+            raise ValueError(f"Config file {path} must hold a JSON object")
+        config.update(from_file)
+    for name in DEFAULTS:
+        value = environ.get(f"WHOSPIES_{name.upper()}")
+        if value is not None:
+            config[name] = value
+
+    config = {name: _validate(name, value) for name, value in config.items()}
+    if not config['refresh_min_seconds'] <= config['refresh_seconds'] <= config['refresh_max_seconds']:
+        raise ValueError("WhoSpies setting refresh_seconds must be between refresh_min_seconds and refresh_max_seconds")
+    return config
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """Get the process-wide settings, loading them on first use"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = load_config()
+        return _config
+
+
+def room_setting(game, name):
+    """A setting for one room: its own override if it has one, else the process-wide value"""
+    overrides = (game or {}).get('settings') or {}
+    if name in overrides:
+        return overrides[name]
+    return get_config()[name]
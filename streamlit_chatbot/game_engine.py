@@ -0,0 +1,227 @@
+"""WhoSpies game rules, independent of the Streamlit UI.
+
+Every action turns into a RoomEvent that is appended to the shared store and
+then published on the event bus, so the UI, bots and tools all drive rooms
+the same way.
+"""
+import atexit
+import random
+import secrets
+import string
+import threading
+from datetime import datetime
+
+from game_config import room_setting, validate_room_settings
+from game_events import (
+    GAME_ENDED, GAME_RESET, GAME_STARTED, LOCATION_GUESSED, PLAYER_JOINED,
+    PLAYER_LEFT, READY_TOGGLED, ROOM_CREATED, SEAT_CLAIMED, VOTE_CAST,
+    VOTING_RESET, VOTING_STARTED, RoomEvent, get_event_bus,
+)
+from game_store import WriteBehindBuffer, get_store
+
+# Expanded locations list
+LOCATIONS = [
+    "Restaurant", "School", "Hospital", "Bank", "Airport",
+    "Beach", "Casino", "Circus", "Embassy", "Hotel",
+    "Military Base", "Movie Studio", "Museum", "Ocean Liner",
+    "Passenger Train", "Pirate Ship", "Polar Station", "Police Station",
+    "Space Station", "Submarine", "Supermarket", "Theater", "University",
+    "Library", "Zoo", "Gym", "Spa", "Bakery", "Farm", "Prison",
+    "Art Gallery", "Nightclub", "Workshop", "Cathedral", "Laboratory"
+]
+
+# Room codes: 6 characters from A-Z0-9, about 2.2 billion possibilities
+ID_ALPHABET = string.ascii_uppercase + string.digits
+ID_LENGTH = 6
+MAX_ID_ATTEMPTS = 20
+
+
+_write_buffer = None
+_write_buffer_lock = threading.Lock()
+
+
+def get_write_buffer():
+    """Get the process-wide write-behind buffer for rapid-fire actions"""
+    global _write_buffer
+    with _write_buffer_lock:
+        if _write_buffer is None:
+            store = get_store()
+            _write_buffer = WriteBehindBuffer(store, on_flush=lambda: get_event_bus().pump(store))
+            atexit.register(_write_buffer.flush)
+        return _write_buffer
+
+
+def record(game_id, event_type, **data):
+    """Append an event to the store, publish it, and return the new room"""
+    store = get_store()
+    # Anything still buffered for the room has to land first
+    get_write_buffer().flush(game_id)
+    game = store.append(RoomEvent(game_id, event_type, data))
+    get_event_bus().pump(store)
+    return game
+
+
+def record_later(game_id, event_type, **data):
+    """Queue an event in the write-behind buffer instead of writing it now"""
+    get_write_buffer().add(RoomEvent(game_id, event_type, data))
+
+
+def generate_game_id():
+    """Generate an unguessable 6-character game ID"""
+    return ''.join(secrets.choice(ID_ALPHABET) for _ in range(ID_LENGTH))
+
+
+def new_seed():
+    """Seed for a room's RNG; it decides who the spy is, so it must be unguessable"""
+    return secrets.randbits(64)
+
+
+def room_rng(game, purpose):
+    """The room's RNG for its current round and one purpose.
+
+    Everything drawn from it is a function of the room's seed, so every
+    session, rerun and replay of a round makes the same choices.
+    """
+    # Rooms from before seeds were stored fall back to their creation time
+    seed = game.get('seed') or game.get('created_at')
+    return random.Random(f"{seed}:{game.get('round', 0)}:{purpose}")
+
+
+def create_new_game(seed=None, settings=None):
+    """Create a new game room, with a fresh seed unless one is given.
+
+    `settings` overrides game_config settings for this room only. The store
+    refuses a ROOM_CREATED event for any ID it has used before, so uniqueness
+    needs no scan of existing rooms; we only retry on the rare collision.
+    """
+    seed = new_seed() if seed is None else seed
+    settings = validate_room_settings(settings or {})
+    for _ in range(MAX_ID_ATTEMPTS):
+        game_id = generate_game_id()
+        if record(game_id, ROOM_CREATED, seed=seed, settings=settings) is not None:
+            return game_id
+    raise RuntimeError("Could not allocate a free game ID")
+
+
+def join_game(game_id, player_name, is_host=False):
+    """Join a game room"""
+    return record(game_id, PLAYER_JOINED, player=player_name, host=is_host) is not None
+
+
+def claim_seat(game_id, player_name, seat_token):
+    """Take over a seat the tournament filled, with its secret; False if it's gone, taken or the secret is wrong"""
+    token = secrets.token_hex(8)
+    game = record(game_id, SEAT_CLAIMED, player=player_name, seat_token=seat_token, token=token)
+    return game is not None and game['players'].get(player_name, {}).get('claimed_by') == token
+
+
+def toggle_ready(game_id, player_name):
+    """Toggle player ready status (buffered, players tend to spam this)"""
+    record_later(game_id, READY_TOGGLED, player=player_name)
+
+
+def leave_game(game_id, player_name):
+    """Remove player from game"""
+    record(game_id, PLAYER_LEFT, player=player_name)
+
+
+def start_game(game_id):
+    """Start the game - assign spy and location"""
+    game = get_store().load(game_id)
+    if game is None:
+        return False
+
+    players = list(game['players'].keys())
+    min_players = room_setting(game, 'min_players')
+    if len(players) < min_players:
+        return False
+
+    # Assign spy and location from the room's own RNG
+    rng = room_rng(game, "start")
+    spy = rng.choice(players)
+    location = rng.choice(LOCATIONS)
+    game = record(game_id, GAME_STARTED, spy=spy, location=location, min_players=min_players)
+    return game is not None and game['game_started'] and game['spy'] == spy
+
+
+def vote_player(game_id, voter, target):
+    """Vote to eliminate a player (anonymously, buffered)"""
+    record_later(game_id, VOTE_CAST, voter=voter, target=target)
+
+
+def guess_location(game_id, player_name, guessed_location):
+    """Submit a location guess (spy only)"""
+    return record(game_id, LOCATION_GUESSED, player=player_name, location=guessed_location) is not None
+
+
+def start_voting(game_id):
+    """Start the voting phase"""
+    record(game_id, VOTING_STARTED)
+
+
+def reset_voting(game_id):
+    """Cancel the current vote (e.g. after a tie)"""
+    record(game_id, VOTING_RESET)
+
+
+def end_game(game_id, winner, elimination_target=None):
+    """End the game with a winner"""
+    record(game_id, GAME_ENDED, winner=winner, elimination_target=elimination_target)
+
+
+def end_if_time_up(game_id, game):
+    """Spy wins if time runs out; returns True if the game was ended"""
+    if not game['game_started'] or game['game_ended'] or not game['start_time']:
+        return False
+    if calculate_time_remaining(game['start_time'], room_setting(game, 'round_seconds')) > 0:
+        return False
+    end_game(game_id, "spy")
+    return True
+
+
+def reset_game(game_id):
+    """Put an ended game back into the briefing room"""
+    record(game_id, GAME_RESET)
+
+
+def count_votes(game):
+    """Count votes by target"""
+    vote_counts = {}
+    for vote_data in game['votes'].values():
+        target = vote_data['target']
+        vote_counts[target] = vote_counts.get(target, 0) + 1
+    return vote_counts
+
+
+def resolve_votes(game_id, game):
+    """Finish the vote once everyone has voted.
+
+    Returns the eliminated player, "" for a tie (voting is reset), or None if
+    votes are still missing.
+    """
+    if len(game['votes']) < len(game['players']):
+        return None
+
+    vote_counts = count_votes(game)
+    max_votes = max(vote_counts.values())
+    most_voted = [player for player, votes in vote_counts.items() if votes == max_votes]
+
+    if len(most_voted) != 1:
+        reset_voting(game_id)
+        return ""
+
+    eliminated_player = most_voted[0]
+    winner = "non-spies" if eliminated_player == game['spy'] else "spy"
+    end_game(game_id, winner, eliminated_player)
+    return eliminated_player
+
+
+def calculate_time_remaining(start_time_str, round_seconds, now=None):
+    """Calculate remaining time from start"""
+    try:
+        start_time = datetime.fromisoformat(start_time_str)
+        elapsed = (now or datetime.now()) - start_time
+        remaining_seconds = round_seconds - elapsed.total_seconds()
+        return max(0, remaining_seconds)
+    except:
+        return round_seconds
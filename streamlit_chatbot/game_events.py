@@ -0,0 +1,434 @@
+"""Room events for WhoSpies.
+
+Every change to a room is described by a RoomEvent. The store applies events
+with `apply_event` and keeps them in its change feed; the EventBus hands them
+to whoever subscribed to that room, so sessions can patch their cached copy
+of a room instead of reloading it.
+"""
+import hmac
+import json
+import threading
+import weakref
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+# Event types
+ROOM_CREATED = "room_created"
+PLAYER_JOINED = "player_joined"
+PLAYER_LEFT = "player_left"
+READY_TOGGLED = "ready_toggled"
+GAME_STARTED = "game_started"
+VOTING_STARTED = "voting_started"
+VOTE_CAST = "vote_cast"
+VOTING_RESET = "voting_reset"
+LOCATION_GUESSED = "location_guessed"
+GAME_ENDED = "game_ended"
+GAME_RESET = "game_reset"
+SEAT_CLAIMED = "seat_claimed"
+
+
+@dataclass
+class RoomEvent:
+    """Something that happened in one room.
+
+    `seq` is the room's version after the event was applied; the store fills
+    it in when the event is appended.
+    """
+    game_id: str
+    type: str
+    data: dict = field(default_factory=dict)
+    at: str = field(default_factory=lambda: str(datetime.now()))
+    seq: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d)
+
+
+def new_room(created_at, seed=None, settings=None):
+    """State of a freshly created room"""
+    return {
+        'seed': seed,
+        'round': 0,
+        'settings': dict(settings or {}),
+        'players': {},
+        'ready_players': [],
+        'host': None,
+        'game_started': False,
+        'game_ended': False,
+        'spy': None,
+        'location': None,
+        'created_at': created_at,
+        'start_time': None,
+        'end_time': None,
+        'votes': {},
+        'vote_counter': 0,
+        'voting_phase': False,
+        'winner': None,
+        'elimination_target': None,
+        'location_guesses': {}
+    }
+
+
+def upgrade_room(game):
+    """Bring a room saved by an older version up to date (in place)"""
+    votes = game.get('votes') or {}
+    if any(not isinstance(vote, dict) for vote in votes.values()):
+        # Votes used to be keyed by voter: {voter: target}
+        votes = {
+            f"vote_{n}": vote if isinstance(vote, dict) else {'voter': key, 'target': vote}
+            for n, (key, vote) in enumerate(votes.items(), 1)
+        }
+    game['votes'] = votes
+    game.setdefault('vote_counter', _last_vote_number(votes))
+    for key, value in new_room(game.get('created_at')).items():
+        game.setdefault(key, value)
+    return game
+
+
+def _last_vote_number(votes):
+    return max((int(vote_id.split('_')[1]) for vote_id in votes), default=0)
+
+
+def _room_created(game, event):
+    return new_room(event.at, event.data.get('seed'), event.data.get('settings'))
+
+
+def _player_joined(game, event):
+    player_name = event.data['player']
+    previous = game['players'].get(player_name, {})
+    game['players'][player_name] = player = {
+        'joined_at': event.at,
+        'is_ready': False
+    }
+    # Seats filled by the tournament scheduler come with a secret for the link
+    # that claims them; being re-seated in the same seat (e.g. made host for
+    # the next round) keeps the secret and the claim
+    seat_token = event.data.get('seat_token', previous.get('seat_token'))
+    if seat_token:
+        player['seat_token'] = seat_token
+        if previous.get('claimed_by') and previous.get('seat_token') == seat_token:
+            player['claimed_by'] = previous['claimed_by']
+    if event.data.get('host'):
+        game['host'] = player_name
+    return game
+
+
+def _player_left(game, event):
+    player_name = event.data['player']
+    if player_name not in game['players']:
+        return game
+    del game['players'][player_name]
+    if player_name in game['ready_players']:
+        game['ready_players'].remove(player_name)
+
+    # Remove their votes, and votes against them
+    game['votes'] = {
+        vote_id: vote for vote_id, vote in game['votes'].items()
+        if player_name not in (vote['voter'], vote['target'])
+    }
+
+    # Remove from location guesses
+    if player_name in game['location_guesses']:
+        del game['location_guesses'][player_name]
+
+    # If no players left, the room is closed
+    if not game['players']:
+        return None
+
+    # If host left, assign new host
+    if game['host'] == player_name:
+        game['host'] = list(game['players'].keys())[0]
+    return game
+
+
+def _ready_toggled(game, event):
+    player_name = event.data['player']
+    if player_name not in game['players']:
+        return game
+    current_status = game['players'][player_name]['is_ready']
+    game['players'][player_name]['is_ready'] = not current_status
+
+    ready_players = game['ready_players']
+    if not current_status:
+        if player_name not in ready_players:
+            ready_players.append(player_name)
+    else:
+        if player_name in ready_players:
+            ready_players.remove(player_name)
+    return game
+
+
+def _game_started(game, event):
+    # The spy was picked from the players the engine saw; ignore the event if
+    # the room changed underneath it
+    if event.data['spy'] not in game['players'] or len(game['players']) < event.data['min_players']:
+        return game
+    game['spy'] = event.data['spy']
+    game['location'] = event.data['location']
+    game['game_started'] = True
+    game['round'] = game.get('round', 0) + 1
+    game['start_time'] = event.at
+    game['end_time'] = None
+    game['votes'] = {}
+    game['voting_phase'] = False
+    game['winner'] = None
+    game['game_ended'] = False
+    game['location_guesses'] = {}
+    return game
+
+
+def _voting_started(game, event):
+    game['voting_phase'] = True
+    game['votes'] = {}
+    return game
+
+
+def _vote_cast(game, event):
+    # Votes from stale pages (target or voter already gone, already voted) don't count
+    voter, target = event.data['voter'], event.data['target']
+    if voter not in game['players'] or target not in game['players']:
+        return game
+    if any(vote['voter'] == voter for vote in game['votes'].values()):
+        return game
+
+    # Anonymous vote ID from a counter that never goes back, so a vote never
+    # replaces one that's still there after someone left
+    if 'vote_counter' not in game:
+        # Room from before the counter existed
+        game['vote_counter'] = _last_vote_number(game['votes'])
+    game['vote_counter'] += 1
+    game['votes'][f"vote_{game['vote_counter']}"] = {'voter': voter, 'target': target}
+    return game
+
+
+def _voting_reset(game, event):
+    game['voting_phase'] = False
+    game['votes'] = {}
+    return game
+
+
+def _location_guessed(game, event):
+    game['location_guesses'][event.data['player']] = event.data['location']
+    return game
+
+
+def _game_ended(game, event):
+    # Two sessions can both notice the end (e.g. the timer); first one wins
+    if game['game_ended'] or not game['game_started']:
+        return game
+    game['game_ended'] = True
+    game['end_time'] = event.at
+    game['winner'] = event.data['winner']
+    if event.data.get('elimination_target'):
+        game['elimination_target'] = event.data['elimination_target']
+    return game
+
+
+def _game_reset(game, event):
+    game['game_started'] = False
+    game['game_ended'] = False
+    game['spy'] = None
+    game['location'] = None
+    game['start_time'] = None
+    game['end_time'] = None
+    game['votes'] = {}
+    game['voting_phase'] = False
+    game['winner'] = None
+    game['elimination_target'] = None
+    game['ready_players'] = []
+    game['location_guesses'] = {}
+
+    # Reset all players to not ready
+    for p_name in game['players']:
+        game['players'][p_name]['is_ready'] = False
+    return game
+
+
+def _seat_claimed(game, event):
+    # A seat filled by the tournament scheduler goes to the first session that
+    # brings its secret
+    player = game['players'].get(event.data['player'])
+    if player is None or player.get('claimed_by') or not player.get('seat_token'):
+        return game
+    if hmac.compare_digest(player['seat_token'].encode(), str(event.data['seat_token']).encode()):
+        player['claimed_by'] = event.data['token']
+    return game
+
+
+_APPLY = {
+    ROOM_CREATED: _room_created,
+    PLAYER_JOINED: _player_joined,
+    PLAYER_LEFT: _player_left,
+    READY_TOGGLED: _ready_toggled,
+    GAME_STARTED: _game_started,
+    VOTING_STARTED: _voting_started,
+    VOTE_CAST: _vote_cast,
+    VOTING_RESET: _voting_reset,
+    LOCATION_GUESSED: _location_guessed,
+    GAME_ENDED: _game_ended,
+    GAME_RESET: _game_reset,
+    SEAT_CLAIMED: _seat_claimed,
+}
+
+EVENT_TYPES = frozenset(_APPLY)
+
+
+def apply_event(game, event):
+    """Apply one event to a room (in place) and return the new room.
+
+    Returns None once the room is closed. Events for a room that doesn't
+    exist yet are ignored, apart from ROOM_CREATED.
+    """
+    if event.type not in _APPLY:
+        raise ValueError(f"Unknown room event type: {event.type!r}")
+    if game is None and event.type != ROOM_CREATED:
+        return None
+    return _APPLY[event.type](game, event)
+
+
+def replay(events, games=None):
+    """Fold a sequence of events into {game_id: room}, e.g. from a saved log"""
+    games = {} if games is None else games
+    for event in events:
+        if isinstance(event, dict):
+            event = RoomEvent.from_dict(event)
+        game = apply_event(games.get(event.game_id), event)
+        if game is None:
+            games.pop(event.game_id, None)
+        else:
+            games[event.game_id] = game
+    return games
+
+
+class EventBus:
+    """Delivers room events to subscribers inside this process.
+
+    Events from other processes arrive through `pump`, which reads the
+    store's change feed; the engine pumps right after each write, so local
+    and remote events take the same path and are delivered exactly once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held while a pump fetches and delivers, so events arrive in order and
+        # a pump returns only once everything before it has been delivered
+        self._delivery_lock = threading.RLock()
+        self._subscribers = {}
+        self._cursor = None
+
+    def subscribe(self, game_id, handler):
+        """Call handler(event) for every event in the room (None = all rooms).
+
+        Bound methods are held weakly, so a subscriber that goes away (like
+        an abandoned browser session) doesn't keep receiving events.
+        """
+        ref = weakref.WeakMethod(handler) if hasattr(handler, '__self__') else (lambda: handler)
+        with self._lock:
+            self._subscribers.setdefault(game_id, []).append(ref)
+        return lambda: self._unsubscribe(game_id, ref)
+
+    def _unsubscribe(self, game_id, ref):
+        with self._lock:
+            refs = self._subscribers.get(game_id, [])
+            if ref in refs:
+                refs.remove(ref)
+            if not refs:
+                self._subscribers.pop(game_id, None)
+
+    def publish(self, event):
+        """Hand an event to the room's subscribers and the catch-all ones"""
+        with self._lock:
+            refs = self._subscribers.get(event.game_id, []) + self._subscribers.get(None, [])
+        for ref in refs:
+            handler = ref()
+            if handler is None:
+                self._unsubscribe(event.game_id, ref)
+                self._unsubscribe(None, ref)
+            else:
+                handler(event)
+
+    def pump(self, store):
+        """Publish everything that reached the store since the last pump"""
+        with self._delivery_lock:
+            with self._lock:
+                if self._cursor is None:
+                    # Start from the tip; anyone subscribing now loads a snapshot
+                    self._cursor = store.events_since(None)[0]
+                    return
+                self._cursor, events = store.events_since(self._cursor)
+            for event in events:
+                self.publish(event)
+
+
+class RoomView:
+    """This session's cached copy of a room, kept current by its events"""
+
+    def __init__(self, game_id, bus, store, max_pending=500):
+        self.game_id = game_id
+        self._store = store
+        self._pending = deque(maxlen=max_pending)
+        self._unsubscribe = bus.subscribe(game_id, self._on_event)
+        self._reload()
+
+    def _on_event(self, event):
+        self._pending.append(event)
+
+    def _reload(self):
+        self._pending.clear()
+        self.game, self.version = self._store.load_versioned(self.game_id)
+
+    def refresh(self):
+        """Apply queued events and return the room (None if it's gone)"""
+        while self._pending:
+            event = self._pending.popleft()
+            if event.seq <= self.version:
+                continue
+            if event.seq != self.version + 1 or self.game is None:
+                # Missed something (queue overflowed); fall back to a snapshot
+                self._reload()
+                break
+            self.game = apply_event(self.game, event)
+            self.version = event.seq
+        return self.game
+
+    def close(self):
+        self._unsubscribe()
+
+
+class EventLog:
+    """Records every event the bus delivers, for debugging and replays"""
+
+    def __init__(self, bus, max_events=None):
+        self.events = deque(maxlen=max_events)
+        self._unsubscribe = bus.subscribe(None, self._on_event)
+
+    def _on_event(self, event):
+        self.events.append(event)
+
+    def dump(self, path):
+        """Write the log as JSON lines"""
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(event.to_dict(), default=str) + "\n")
+
+    @staticmethod
+    def load(path):
+        """Read a log written by dump"""
+        with open(path, 'r') as f:
+            return [RoomEvent.from_dict(json.loads(line)) for line in f if line.strip()]
+
+    def close(self):
+        self._unsubscribe()
+
+
+_bus = EventBus()
+
+
+def get_event_bus():
+    """Get the process-wide event bus"""
+    return _bus
@@ -0,0 +1,775 @@
+"""Shared room storage for WhoSpies.
+
+Every Streamlit worker process talks to the same backend, picked with the
+WHOSPIES_STORE environment variable:
+
+    json    a snapshot file (WHOSPIES_GAMES_FILE) plus an event log next to
+            it, fine for a single process
+    sqlite  one SQLite database (WHOSPIES_DB), safe for several processes
+            running behind a load balancer
+
+Rooms are event-sourced: every change is a RoomEvent (see game_events.py)
+appended to the room's history, and the current room is the fold of those
+events. Snapshots are taken every SNAPSHOT_EVERY events so rebuilding a room
+only replays the events after the latest snapshot. The full history is kept
+for audits and post-game replays (`history(game_id)`).
+
+Each room's version is the seq of its latest event, and every event also
+lands in a global change feed. Workers call `events_since(cursor)` to pick up
+what other workers did, instead of re-reading everything.
+
+Writes are fsynced before an append returns (WHOSPIES_FSYNC=0 turns that off,
+e.g. for benchmarks), so a crash loses nothing the store acknowledged. Ready
+toggles and votes are the exception: the page shows them straight away, but
+the WriteBehindBuffer holds them for up to WRITE_WINDOW (250 ms) before they
+reach the store, and a crash in that window loses them.
+"""
+import copy
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from game_events import READY_TOGGLED, ROOM_CREATED, VOTE_CAST, RoomEvent, apply_event, upgrade_room
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# File to store game data (shared across all sessions)
+GAMES_FILE = os.environ.get("WHOSPIES_GAMES_FILE", os.path.join(BASE_DIR, "games_data.json"))
+SQLITE_FILE = os.environ.get("WHOSPIES_DB", os.path.join(BASE_DIR, "games_data.db"))
+STORE_BACKEND = os.environ.get("WHOSPIES_STORE", "json").lower()
+FSYNC = os.environ.get("WHOSPIES_FSYNC", "1") != "0"
+
+# Take a snapshot after this many events
+SNAPSHOT_EVERY = 100
+
+# How many events the JSON backend keeps in memory for its change feed
+CHANGE_FEED_LENGTH = 10000
+
+# How long the write-behind buffer collects a room's events before writing
+WRITE_WINDOW = 0.25
+
+# Failed buffered writes worth retrying (a locked database, a full disk), and
+# how many tries a room's events get before they're dropped
+RETRYABLE_WRITE_ERRORS = (sqlite3.OperationalError, OSError)
+MAX_WRITE_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+class _BadEvent(Exception):
+    """An event in the log that can't be applied to its room"""
+
+
+def _fold(games, versions, event, atomic=False):
+    # atomic: apply to a copy, so an event that fails leaves the room untouched
+    game = games.get(event.game_id)
+    game = apply_event(copy.deepcopy(game) if atomic else game, event)
+    if game is None:
+        games.pop(event.game_id, None)
+    else:
+        games[event.game_id] = game
+    versions[event.game_id] = event.seq
+
+
+def _fsync_dir(path):
+    # Makes a rename inside the directory durable too
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JsonStore:
+    """Rooms in memory, backed by an append-only event log and a snapshot file.
+
+    Only safe inside a single server process. The event log is the journal:
+    every event is written (and fsynced) to it before an append returns. The
+    fsync runs outside the store's lock and is shared by every append waiting
+    on it (group commit), so reads never wait on the disk; events only reach
+    the change feed once they're synced. The snapshot records how far into
+    the log it goes, so startup loads it and replays just the tail; a write
+    torn by a crash at the end of the log is cut off, and an event that can't
+    be applied is logged and skipped. Snapshots are taken by a
+    background checkpointer that folds the log into its own copy of the rooms,
+    so reads and appends never wait for one.
+    """
+
+    def __init__(self, path=GAMES_FILE, snapshot_every=SNAPSHOT_EVERY, fsync=FSYNC):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".events.jsonl"
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._feed = deque(maxlen=CHANGE_FEED_LENGTH)
+        self._since_snapshot = 0
+        self._games, self._versions, snapshot_offset = self._read_snapshot()
+        try:
+            self._log_offset = self._replay_log(snapshot_offset)
+        except _BadEvent:
+            self._log_offset = None
+        if self._log_offset is None:
+            # The rooms are half-replayed; start over, skipping what can't be applied
+            self._since_snapshot = 0
+            self._games, self._versions, snapshot_offset = self._read_snapshot()
+            self._log_offset = self._replay_log(snapshot_offset, skip_bad=True)
+        self._log = open(self.log_path, 'ab')
+        # Group commit: writes waiting for an fsync, and how far the log is synced
+        self._sync_lock = threading.Lock()
+        self._synced_to = self._log_offset
+        self._unpublished = deque()
+
+        # The checkpointer's copy of the rooms and how far into the log it is
+        self._checkpoint_lock = threading.Lock()
+        self._checkpointed = (copy.deepcopy(self._games), dict(self._versions), self._log_offset)
+        if self._log_offset < snapshot_offset:
+            # The log is shorter than the snapshot says (deleted or replaced);
+            # the snapshot is all we have, so restart the log from it
+            self.checkpoint()
+        self._checkpoint_due = threading.Event()
+        self._closing = False
+        self._checkpointer = threading.Thread(target=self._run_checkpointer, name="JsonStore checkpointer", daemon=True)
+        self._checkpointer.start()
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}, {}, 0
+        try:
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+        except ValueError as e:
+            # The log holds every event ever appended, so the rooms can still be rebuilt
+            if not os.path.exists(self.log_path):
+                raise ValueError(f"Snapshot {self.path} is unreadable and there is no event log to rebuild from: {e}") from None
+            logger.warning("Snapshot %s is unreadable (%s); rebuilding all rooms from %s", self.path, e, self.log_path)
+            return {}, {}, 0
+        if 'rooms' not in snapshot:
+            # Plain {game_id: room} file from before the event log existed
+            snapshot = {'rooms': snapshot, 'versions': {}, 'log_offset': 0}
+        for game in snapshot['rooms'].values():
+            upgrade_room(game)
+        return snapshot['rooms'], snapshot['versions'], snapshot['log_offset']
+
+    def _replay_log(self, offset, skip_bad=False):
+        """Apply the log after offset; returns where the intact log ends.
+
+        Raises _BadEvent for an event that can't be applied, unless skip_bad,
+        which applies each event to a copy of its room (slower) and skips the
+        ones that fail.
+        """
+        if not os.path.exists(self.log_path):
+            return 0
+        end, torn_at = offset, None
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("no newline")
+                    event = RoomEvent.from_dict(json.loads(line))
+                except (ValueError, TypeError):
+                    if torn_at is None:
+                        torn_at = end
+                    continue
+                if torn_at is not None:
+                    # Only the last write can be torn; damage before that is real corruption
+                    raise ValueError(f"Event log {self.log_path} is corrupt at byte {torn_at}")
+                try:
+                    _fold(self._games, self._versions, event, atomic=skip_bad)
+                except Exception as e:
+                    if not skip_bad:
+                        raise _BadEvent() from e
+                    # Logged by an older version that wrote events before applying
+                    # them; the room stays as it was before this event
+                    logger.exception("Skipping %s event at byte %d of %s that can't be applied",
+                                     event.type, end, self.log_path)
+                self._since_snapshot += 1
+                end += len(line)
+        if torn_at is not None:
+            logger.warning("Cutting a torn write off the end of %s at byte %d", self.log_path, torn_at)
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(torn_at)
+                os.fsync(f.fileno())
+        return end
+
+    def _write_snapshot(self, games, versions, log_offset):
+        # Write to a temp file first so a crash never leaves half a file behind
+        snapshot = {
+            'log_offset': log_offset,
+            'versions': versions,
+            'rooms': games,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, default=str, indent=2)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if self.fsync:
+            _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+    def checkpoint(self):
+        """Fold the log into the snapshot file.
+
+        Works from the checkpointer's own copy of the rooms and the log on
+        disk, so the store's lock is only held to read the log's length.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                end = self._log_offset
+            games, versions, offset = self._checkpointed
+            if end > offset:
+                with open(self.log_path, 'rb') as f:
+                    f.seek(offset)
+                    for line in f.read(end - offset).splitlines():
+                        _fold(games, versions, RoomEvent.from_dict(json.loads(line)))
+            self._write_snapshot(games, versions, end)
+            self._checkpointed = (games, versions, end)
+
+    def _run_checkpointer(self):
+        while True:
+            self._checkpoint_due.wait()
+            self._checkpoint_due.clear()
+            if self._closing:
+                return
+            try:
+                self.checkpoint()
+            except Exception:
+                # The log still has everything; the next checkpoint will catch up
+                logger.exception("Checkpoint of %s failed", self.path)
+
+    def load(self, game_id):
+        """Load one room, or None if it doesn't exist"""
+        return self.load_versioned(game_id)[0]
+
+    def load_versioned(self, game_id):
+        """Load one room together with its version"""
+        with self._lock:
+            if game_id not in self._games:
+                return None, 0
+            return copy.deepcopy(self._games[game_id]), self._versions.get(game_id, 0)
+
+    def append(self, event):
+        """Append an event to its room's history and apply it.
+
+        Returns the new room, or None if the room doesn't exist (or was just
+        closed). A ROOM_CREATED event for an ID that was ever used returns
+        None, so a room's history never mixes two games.
+        """
+        return self.append_many([event])[0]
+
+    def append_many(self, events):
+        """Append several events with a single log flush; returns what append would for each.
+
+        Events are applied to copies of their rooms first, so if one can't be
+        applied nothing is written and the error is raised, like a rolled
+        back SQLite transaction.
+        """
+        results = []
+        written = []
+        heads = {}
+        with self._lock:
+            for event in events:
+                head = heads.get(event.game_id)
+                if head is None:
+                    head = heads[event.game_id] = {
+                        'used': event.game_id in self._versions or event.game_id in self._games,
+                        'version': self._versions.get(event.game_id, 0),
+                        'game': copy.deepcopy(self._games.get(event.game_id)),
+                    }
+                if event.type == ROOM_CREATED and head['used']:
+                    results.append(None)
+                    continue
+                if event.type != ROOM_CREATED and head['game'] is None:
+                    results.append(None)
+                    continue
+
+                event.seq = head['version'] + 1
+                head.update(used=True, version=event.seq, game=apply_event(head['game'], event), dirty=True)
+                written.append(event)
+                results.append(copy.deepcopy(head['game']))
+
+            for event in written:
+                self._log.write(json.dumps(event.to_dict(), default=str).encode() + b"\n")
+            for game_id, head in heads.items():
+                if not head.get('dirty'):
+                    continue
+                if head['game'] is None:
+                    self._games.pop(game_id, None)
+                else:
+                    self._games[game_id] = head['game']
+                self._versions[game_id] = head['version']
+            self._since_snapshot += len(written)
+            self._log.flush()
+            end = self._log.tell()
+            self._unpublished.append((end, written))
+            if not self.fsync:
+                self._publish(end)
+        if self.fsync:
+            self._sync(end)
+        return results
+
+    def _sync(self, end):
+        """Group commit: fsync the log up to at least end, outside the store lock.
+
+        Whoever gets the sync lock first syncs everything written so far, so
+        appends that pile up behind one fsync share the next one.
+        """
+        with self._sync_lock:
+            if self._synced_to >= end:
+                return
+            with self._lock:
+                target = self._log.tell()
+            os.fsync(self._log.fileno())
+            self._synced_to = target
+            with self._lock:
+                self._publish(target)
+
+    def _publish(self, synced_to):
+        # Events reach the change feed (and history and checkpoints) only once
+        # they're on disk; called with the store lock held
+        while self._unpublished and self._unpublished[0][0] <= synced_to:
+            end, written = self._unpublished.popleft()
+            for event in written:
+                self._seq += 1
+                self._feed.append((self._seq, event))
+            self._log_offset = end
+        if self._since_snapshot >= self.snapshot_every:
+            self._since_snapshot = 0
+            self._checkpoint_due.set()
+
+    def history(self, game_id):
+        """Every event ever appended to a room, oldest first"""
+        # The log is append-only, so everything before _log_offset can be read
+        # without holding up other sessions
+        with self._lock:
+            end = self._log_offset
+        with open(self.log_path, 'rb') as f:
+            events = [json.loads(line) for line in f.read(end).splitlines()]
+        return [RoomEvent.from_dict(event) for event in events if event['game_id'] == game_id]
+
+    def version(self, game_id):
+        """Current version of a room (0 if it doesn't exist)"""
+        with self._lock:
+            return self._versions.get(game_id, 0) if game_id in self._games else 0
+
+    def events_since(self, cursor):
+        """Return (new_cursor, events appended after cursor).
+
+        A cursor of None just returns the current position.
+        """
+        with self._lock:
+            if cursor is None or cursor >= self._seq:
+                return self._seq, []
+            # Feed seqs have no gaps, so what's new is the last _seq - cursor
+            # entries; walk just those back from the tail
+            new = itertools.islice(reversed(self._feed), min(self._seq - cursor, len(self._feed)))
+            return self._seq, [event for _, event in new][::-1]
+
+    def close(self, checkpoint=True):
+        """Stop the checkpointer and close the log, taking a last snapshot unless told not to"""
+        self._closing = True
+        self._checkpoint_due.set()
+        self._checkpointer.join()
+        if checkpoint:
+            self.checkpoint()
+        with self._lock:
+            self._log.close()
+
+
+class SqliteStore:
+    """Rooms in a SQLite database, shared by every process that opens it.
+
+    `events` is the append-only history (its rowid doubles as the change
+    feed cursor), `snapshots` holds the latest fold of each room, and `rooms`
+    tracks each room's head so appends don't have to scan anything.
+    """
+
+    def __init__(self, path=SQLITE_FILE, snapshot_every=SNAPSHOT_EVERY, fsync=FSYNC):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._local = threading.local()
+        # game_id -> (version, room) for rooms this process has folded already
+        self._cache = {}
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rooms ("
+                " game_id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " snapshot_seq INTEGER NOT NULL,"
+                " closed INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " feed_seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " game_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " event TEXT NOT NULL,"
+                " UNIQUE (game_id, seq))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " game_id TEXT PRIMARY KEY,"
+                " seq INTEGER NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads, so one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL can lose the last commits on power loss; FULL can't
+            conn.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, mode="IMMEDIATE"):
+        return _Transaction(self._conn(), mode)
+
+    def _room(self, conn, game_id, version, snapshot_seq):
+        """Current state of a room, from the cache if it's up to date"""
+        cached = self._cache.get(game_id)
+        if cached is not None and cached[0] == version:
+            return copy.deepcopy(cached[1])
+        game = self._rebuild(conn, game_id, snapshot_seq)
+        self._cache[game_id] = (version, copy.deepcopy(game))
+        return game
+
+    def _rebuild(self, conn, game_id, snapshot_seq):
+        """Fold a room from its snapshot and the events after it"""
+        game = None
+        if snapshot_seq:
+            row = conn.execute("SELECT data FROM snapshots WHERE game_id = ?", (game_id,)).fetchone()
+            game = json.loads(row[0])
+        rows = conn.execute(
+            "SELECT event FROM events WHERE game_id = ? AND seq > ? ORDER BY seq",
+            (game_id, snapshot_seq),
+        ).fetchall()
+        for (event,) in rows:
+            game = apply_event(game, RoomEvent.from_dict(json.loads(event)))
+        return game
+
+    def load(self, game_id):
+        """Load one room, or None if it doesn't exist"""
+        return self.load_versioned(game_id)[0]
+
+    def load_versioned(self, game_id):
+        """Load one room together with its version"""
+        with self._transaction("DEFERRED") as conn:
+            row = conn.execute(
+                "SELECT version, snapshot_seq, closed FROM rooms WHERE game_id = ?", (game_id,)
+            ).fetchone()
+            if row is None or row[2]:
+                return None, 0
+            return self._room(conn, game_id, row[0], row[1]), row[0]
+
+    def append(self, event):
+        """Append an event to its room's history and apply it.
+
+        Returns the new room, or None if the room doesn't exist (or was just
+        closed). A ROOM_CREATED event for an ID that was ever used returns
+        None, so a room's history never mixes two games.
+        """
+        return self.append_many([event])[0]
+
+    def append_many(self, events):
+        """Append several events in one transaction; returns what append would for each"""
+        results = []
+        heads = {}
+        with self._transaction() as conn:
+            for event in events:
+                head = heads.get(event.game_id)
+                if head is None:
+                    row = conn.execute(
+                        "SELECT version, snapshot_seq, closed FROM rooms WHERE game_id = ?", (event.game_id,)
+                    ).fetchone()
+                    if row is None:
+                        head = {'used': False, 'version': 0, 'snapshot_seq': 0, 'game': None}
+                    else:
+                        game = None if row[2] else self._room(conn, event.game_id, row[0], row[1])
+                        head = {'used': True, 'version': row[0], 'snapshot_seq': row[1], 'game': game}
+                    heads[event.game_id] = head
+
+                if event.type == ROOM_CREATED and head['used']:
+                    results.append(None)
+                    continue
+                if event.type != ROOM_CREATED and head['game'] is None:
+                    results.append(None)
+                    continue
+
+                event.seq = head['version'] + 1
+                game = apply_event(head['game'], event)
+                conn.execute(
+                    "INSERT INTO events (game_id, seq, event) VALUES (?, ?, ?)",
+                    (event.game_id, event.seq, json.dumps(event.to_dict(), default=str)),
+                )
+                if game is not None and event.seq - head['snapshot_seq'] >= self.snapshot_every:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO snapshots (game_id, seq, data) VALUES (?, ?, ?)",
+                        (event.game_id, event.seq, json.dumps(game, default=str)),
+                    )
+                    head['snapshot_seq'] = event.seq
+                head.update(used=True, version=event.seq, game=game, dirty=True)
+                results.append(copy.deepcopy(game))
+
+            for game_id, head in heads.items():
+                if not head.get('dirty'):
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO rooms (game_id, version, snapshot_seq, closed) VALUES (?, ?, ?, ?)",
+                    (game_id, head['version'], head['snapshot_seq'], int(head['game'] is None)),
+                )
+                if head['game'] is None:
+                    conn.execute("DELETE FROM snapshots WHERE game_id = ?", (game_id,))
+
+        # Only cache once the transaction has committed
+        for game_id, head in heads.items():
+            if head['game'] is None:
+                self._cache.pop(game_id, None)
+            elif head.get('dirty'):
+                self._cache[game_id] = (head['version'], copy.deepcopy(head['game']))
+        return results
+
+    def history(self, game_id):
+        """Every event ever appended to a room, oldest first"""
+        rows = self._conn().execute(
+            "SELECT event FROM events WHERE game_id = ? ORDER BY seq", (game_id,)
+        ).fetchall()
+        return [RoomEvent.from_dict(json.loads(event)) for (event,) in rows]
+
+    def version(self, game_id):
+        """Current version of a room (0 if it doesn't exist)"""
+        row = self._conn().execute(
+            "SELECT version FROM rooms WHERE game_id = ? AND closed = 0", (game_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def events_since(self, cursor):
+        """Return (new_cursor, events appended after cursor).
+
+        A cursor of None just returns the current position.
+        """
+        conn = self._conn()
+        if cursor is None:
+            return conn.execute("SELECT COALESCE(MAX(feed_seq), 0) FROM events").fetchone()[0], []
+        rows = conn.execute(
+            "SELECT feed_seq, event FROM events WHERE feed_seq > ? ORDER BY feed_seq", (cursor,)
+        ).fetchall()
+        if not rows:
+            return cursor, []
+        return rows[-1][0], [RoomEvent.from_dict(json.loads(event)) for _, event in rows]
+
+    def close(self, checkpoint=True):
+        """Close this thread's connection, folding the WAL into the database first unless told not to"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            if checkpoint:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent writers queue up instead of racing.
+
+    Reads use a DEFERRED transaction, which just gives them a consistent view.
+    """
+
+    def __init__(self, conn, mode="IMMEDIATE"):
+        self.conn = conn
+        self.mode = mode
+
+    def __enter__(self):
+        self.conn.execute(f"BEGIN {self.mode}")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def coalesce(events):
+    """Drop buffered events that cancel out or repeat.
+
+    A ready toggle undone by the same player before it was written cancels
+    out, and a second vote from the same voter is dropped.
+    """
+    kept = []
+    voters = set()
+    for event in events:
+        if event.type == READY_TOGGLED:
+            earlier = next(
+                (i for i in range(len(kept) - 1, -1, -1)
+                 if kept[i].type == READY_TOGGLED and kept[i].data['player'] == event.data['player']),
+                None,
+            )
+            if earlier is not None:
+                del kept[earlier]
+                continue
+        elif event.type == VOTE_CAST:
+            if event.data['voter'] in voters:
+                continue
+            voters.add(event.data['voter'])
+        kept.append(event)
+    return kept
+
+
+class WriteBehindBuffer:
+    """Collects a room's events for WRITE_WINDOW seconds, then writes them at once.
+
+    Meant for rapid-fire actions like ready toggles and votes: however often
+    players click, each room costs at most one store write per window. One
+    flusher thread writes rooms as their windows close, so the SQLite backend
+    keeps a single connection for it. A write that fails with one of the
+    RETRYABLE_WRITE_ERRORS is logged and its events go back in the queue, to
+    be retried after a window that doubles each time; after
+    MAX_WRITE_ATTEMPTS, or on any other error, the events are logged and
+    dropped so the room doesn't stay stuck behind them.
+    """
+
+    def __init__(self, store, window=WRITE_WINDOW, on_flush=None):
+        self.store = store
+        self.window = window
+        self.on_flush = on_flush
+        self._lock = threading.Condition()
+        # Held from taking a batch until it's written, so a room's batches land in order
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._due = {}
+        self._attempts = {}
+        self._flusher = None
+
+    def add(self, event):
+        """Queue an event; the room is flushed when its window closes"""
+        with self._lock:
+            pending = self._pending.get(event.game_id)
+            if pending is None:
+                pending = self._pending[event.game_id] = []
+                self._due[event.game_id] = time.monotonic() + self.window
+                self._lock.notify()
+            pending.append(event)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="WriteBehindBuffer flusher", daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                due = [game_id for game_id, at in self._due.items() if at <= now]
+                if not due:
+                    self._lock.wait(min(self._due.values()) - now if self._due else None)
+                    continue
+            for game_id in due:
+                try:
+                    self.flush(game_id)
+                except Exception:
+                    pass  # Logged by flush
+
+    def preview(self, game_id, game):
+        """The room as it will look once its pending events are written"""
+        with self._lock:
+            pending = list(self._pending.get(game_id, ()))
+        if not pending or game is None:
+            return game
+        game = copy.deepcopy(game)
+        for event in coalesce(pending):
+            game = apply_event(game, event)
+            if game is None:
+                break
+        return game
+
+    def flush(self, game_id=None):
+        """Write pending events for one room (or all rooms) now.
+
+        If the write fails with an error worth retrying, the events are put
+        back in the queue and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if game_id is None:
+                    taken = dict(self._pending)
+                    self._pending.clear()
+                    self._due.clear()
+                else:
+                    taken = {game_id: self._pending.pop(game_id)} if game_id in self._pending else {}
+                    self._due.pop(game_id, None)
+            if not taken:
+                return
+            written = self._write(taken)
+        if written and self.on_flush:
+            self.on_flush()
+
+    def _write(self, taken):
+        # Returns whether anything was written; called with the flush lock held
+        events = [event for batch in taken.values() for event in coalesce(batch)]
+        try:
+            self.store.append_many(events)
+        except RETRYABLE_WRITE_ERRORS:
+            logger.exception("Writing %d buffered events failed", len(events))
+            self._retry(taken)
+            raise
+        except Exception:
+            if len(taken) > 1:
+                # Write room by room, so only the room at fault loses its events
+                written = False
+                for game_id, batch in taken.items():
+                    try:
+                        written = self._write({game_id: batch}) or written
+                    except RETRYABLE_WRITE_ERRORS:
+                        pass  # Logged and requeued
+                return written
+            logger.exception("Dropping %d buffered events for room %s that can't be written",
+                             len(events), next(iter(taken)))
+            self._forget_attempts(taken)
+            return False
+        self._forget_attempts(taken)
+        return True
+
+    def _retry(self, taken):
+        # Ahead of anything queued since, so the room's events stay in order
+        with self._lock:
+            for game_id, batch in taken.items():
+                attempts = self._attempts.get(game_id, 0) + 1
+                if attempts >= MAX_WRITE_ATTEMPTS:
+                    logger.error("Dropping %d buffered events for room %s after %d failed writes",
+                                 len(batch), game_id, attempts)
+                    self._attempts.pop(game_id, None)
+                    continue
+                self._attempts[game_id] = attempts
+                self._pending[game_id] = batch + self._pending.get(game_id, [])
+                self._due[game_id] = time.monotonic() + self.window * 2 ** attempts
+            self._lock.notify()
+
+    def _forget_attempts(self, taken):
+        with self._lock:
+            for game_id in taken:
+                self._attempts.pop(game_id, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Get the process-wide store for the configured backend"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STORE_BACKEND == "sqlite":
+                _store = SqliteStore(SQLITE_FILE)
+            elif STORE_BACKEND == "json":
+                _store = JsonStore(GAMES_FILE)
+            else:
+                raise ValueError(f"Unknown WHOSPIES_STORE backend: {STORE_BACKEND!r}")
+        return _store
@@ -0,0 +1,26 @@
+"""Per-session rate limiting for WhoSpies buttons."""
+import time
+
+
+class ActionRateLimiter:
+    """Token bucket per action.
+
+    Each action allows `burst` clicks in a row, then refills at `rate` clicks
+    per second. Keep one limiter per session (in st.session_state).
+    """
+
+    def __init__(self, rate=2.0, burst=4):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    def allow(self, action, now=None):
+        """Take a token for the action; False means the click should be ignored"""
+        now = time.monotonic() if now is None else now
+        tokens, last = self._buckets.get(action, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[action] = (tokens, now)
+            return False
+        self._buckets[action] = (tokens - 1, now)
+        return True
@@ -0,0 +1,156 @@
+"""Adaptive auto-refresh for WhoSpies pages.
+
+Every auto-refresh is a full rerun of the page for one viewer, so instead of
+sleeping a fixed interval the page asks `next_refresh` how long to wait:
+
+- voting and the last FINAL_SECONDS of the timer poll at refresh_min_seconds
+- a full lobby (full_lobby_players or more) polls at refresh_max_seconds
+- an ended game isn't polled by its host, whose "Start New Mission" reruns
+  the page anyway; everyone else polls it from refresh_max_seconds, backing
+  off to ENDED_MAX_SECONDS, so they see the restart without clicking
+- otherwise the player's chosen rate is used, doubled every time the room's
+  version hasn't moved since the last run, up to refresh_max_seconds
+
+A room's own refresh_seconds is a floor on all of these. Each decision is
+counted in the process-wide RefreshStats, which the sidebar shows.
+"""
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from game_config import get_config, room_setting
+from game_engine import calculate_time_remaining
+
+# The timer turns red, and the page polls fast, for the last this many seconds
+FINAL_SECONDS = 30
+
+# Longest a player waits to see the host start the next mission
+ENDED_MAX_SECONDS = 15
+
+# Why a delay was picked
+MISSING = "missing"
+ENDED = "ended"
+WAITING = "waiting_restart"
+VOTING = "voting"
+FINAL = "final_seconds"
+FULL_LOBBY = "full_lobby"
+LOBBY = "lobby"
+PLAYING = "playing"
+
+# Phases where nothing is urgent, so an unchanged room backs off
+BACKOFF_REASONS = (LOBBY, PLAYING)
+
+
+@dataclass(frozen=True)
+class RefreshDecision:
+    """Seconds until the page reruns (None: don't rerun) and why"""
+    delay: float
+    reason: str
+    backed_off: bool = False
+
+
+class RefreshBackoff:
+    """How many runs in a row found the room unchanged; one per session"""
+
+    def __init__(self):
+        self.key = None
+        self.unchanged = 0
+
+    def observe(self, game_id, version):
+        key = (game_id, version)
+        if key == self.key:
+            self.unchanged += 1
+        else:
+            self.key = key
+            self.unchanged = 0
+        return self.unchanged
+
+
+def next_refresh(game_id, game, version, preferred, backoff, is_host=False, now=None):
+    """Decide when a page showing this room (or its spectator snapshot) reruns"""
+    if game is None:
+        return RefreshDecision(None, MISSING)
+    if game['game_ended'] and is_host:
+        return RefreshDecision(None, ENDED)
+
+    config = get_config()
+    fast, slow = config['refresh_min_seconds'], max(config['refresh_max_seconds'], preferred)
+    unchanged = backoff.observe(game_id, version)
+
+    if game['game_ended']:
+        delay = min(slow * 2 ** min(unchanged, 10), max(ENDED_MAX_SECONDS, slow))
+        return RefreshDecision(_room_floor(game, delay), WAITING, delay > slow)
+
+    remaining = None
+    if not game['game_started']:
+        if len(game['players']) >= config['full_lobby_players']:
+            delay, reason = slow, FULL_LOBBY
+        else:
+            delay, reason = preferred, LOBBY
+    elif game['voting_phase']:
+        delay, reason = fast, VOTING
+    else:
+        if game['start_time']:
+            remaining = calculate_time_remaining(game['start_time'], room_setting(game, 'round_seconds'), now)
+        if remaining is not None and remaining <= FINAL_SECONDS:
+            delay, reason = fast, FINAL
+        else:
+            delay, reason = preferred, PLAYING
+
+    backed_off = False
+    if reason in BACKOFF_REASONS and unchanged:
+        backed = min(preferred * 2 ** min(unchanged, 10), slow)
+        backed_off = backed > delay
+        delay = backed
+    if remaining is not None and reason == PLAYING:
+        # Wake up in time for the final seconds
+        delay = min(delay, max(fast, remaining - FINAL_SECONDS))
+
+    return RefreshDecision(_room_floor(game, delay), reason, backed_off)
+
+
+def _room_floor(game, delay):
+    floor = (game.get('settings') or {}).get('refresh_seconds')
+    return max(delay, floor) if floor else delay
+
+
+class RefreshStats:
+    """Refresh decisions made in this process, by reason"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._counts = Counter()
+        self._delays = Counter()
+        self._backed_off = 0
+
+    def record(self, decision):
+        with self._lock:
+            self._counts[decision.reason] += 1
+            self._delays[decision.reason] += decision.delay or 0
+            self._backed_off += decision.backed_off
+
+    def summary(self):
+        """Decisions and mean delay per reason, and scheduled reruns per hour"""
+        with self._lock:
+            hours = max(time.monotonic() - self._started, 1) / 3600
+            reruns = sum(count for reason, count in self._counts.items() if reason not in (MISSING, ENDED))
+            return {
+                'decisions': sum(self._counts.values()),
+                'reruns': reruns,
+                'reruns_per_hour': reruns / hours,
+                'backed_off': self._backed_off,
+                'reasons': {
+                    reason: {'count': count, 'mean_delay': self._delays[reason] / count}
+                    for reason, count in self._counts.most_common()
+                },
+            }
+
+
+_stats = RefreshStats()
+
+
+def get_refresh_stats():
+    """Get the process-wide refresh stats"""
+    return _stats
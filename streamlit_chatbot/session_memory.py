@@ -0,0 +1,129 @@
+"""Session state footprint for WhoSpies and the chatbot.
+
+Streamlit keeps st.session_state alive for as long as the browser tab is
+open, so anything a session appends per game or per message has to be reset
+or trimmed. This module measures a session's state, resets per-game keys when
+the session moves on to a new game, and trims lists that push a session over
+its budget. The functions take any mapping, so they work on a plain dict too.
+"""
+import sys
+import threading
+import time
+from collections import deque
+
+SESSION_BUDGET_BYTES = 256 * 1024
+
+# Keys that only belong to one game, and what they reset to
+PER_GAME_STATE = {
+    'location_guesses': list,
+}
+
+# Widget keys that belong to one game; they're dropped so the widget starts fresh
+PER_GAME_WIDGETS = ('final_guess',)
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by obj and everything it references.
+
+    Objects are followed through their public attributes only, so handles to
+    shared things (the store, the event bus) aren't counted against a session.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += sum(deep_size(v, seen) for k, v in vars(obj).items() if not k.startswith('_'))
+    return size
+
+
+def inspect_session(state, budget=SESSION_BUDGET_BYTES):
+    """Report the size of each session_state key, biggest first"""
+    sizes = {key: deep_size(state[key]) for key in list(state.keys())}
+    total = sum(sizes.values())
+    return {
+        'total_bytes': total,
+        'budget_bytes': budget,
+        'over_budget': total > budget,
+        'keys': dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def reset_game_state(state):
+    """Forget everything that belonged to the previous game"""
+    for key, factory in PER_GAME_STATE.items():
+        state[key] = factory()
+    for key in PER_GAME_WIDGETS:
+        if key in state:
+            del state[key]
+
+
+def track_game(state, game_id, game):
+    """Reset per-game state whenever the session moves on to another game.
+
+    A game is its room plus its start time, so switching rooms, "Start New
+    Mission" and the next round starting all count as a new game.
+    """
+    current = (game_id, game.get('start_time') if game else None)
+    if state.get('game_key') != current:
+        reset_game_state(state)
+        state['game_key'] = current
+
+
+def enforce_budget(state, trimmable, budget=SESSION_BUDGET_BYTES):
+    """Drop the oldest half of the given list keys until the session fits.
+
+    Returns the report after trimming.
+    """
+    report = inspect_session(state, budget)
+    for key in trimmable:
+        while report['over_budget'] and key in state and state[key]:
+            items = state[key]
+            del items[:max(1, len(items) // 2)]
+            report = inspect_session(state, budget)
+    return report
+
+
+class SessionRegistry:
+    """Latest footprint of every session in this process.
+
+    Sessions that haven't reported for `ttl` seconds are assumed closed and
+    dropped.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def update(self, session_id, report):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), report['total_bytes'])
+
+    def summary(self):
+        """Sessions, total and largest footprint across this process"""
+        now = time.monotonic()
+        with self._lock:
+            for session_id, (seen, _) in list(self._sessions.items()):
+                if now - seen > self.ttl:
+                    del self._sessions[session_id]
+            sizes = [size for _, size in self._sessions.values()]
+        return {
+            'sessions': len(sizes),
+            'total_bytes': sum(sizes),
+            'largest_bytes': max(sizes, default=0),
+        }
+
+
+_registry = SessionRegistry()
+
+
+def get_session_registry():
+    """Get the process-wide session registry"""
+    return _registry
@@ -0,0 +1,418 @@
+"""Soak test for WhoSpies: bot players driving many rooms through full games.
+
+    python simulator.py --rooms 1000 --workers 8 --duration 3600
+    WHOSPIES_STORE=sqlite python simulator.py --processes 4 --rooms 4000 --duration 7200
+
+Each worker thread owns a slice of the rooms and advances every one of them a
+step at a time, so thousands of rooms are live at once. A room plays
+--rounds games and is then closed and replaced by a fresh one, until the
+time is up. After every step the room's invariants are checked (exactly one
+spy, exactly one winner per ended game, no orphaned or overwritten votes,
+one vote per player); violations are listed at the end and make the run exit
+non-zero, as does a worker thread that dies. Throughput and memory are
+reported periodically so leaks and slowdowns show up as trends. Bots and
+rooms (spy, location) are seeded from --seed, so a rerun makes the same
+choices; only the timing of rounds depends on the machine.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from game_config import get_config, room_setting
+from game_engine import (
+    LOCATIONS, create_new_game, end_game, end_if_time_up,
+    get_write_buffer, guess_location, join_game, leave_game, reset_game,
+    resolve_votes, start_game, start_voting, toggle_ready, vote_player,
+)
+from game_events import GAME_ENDED, get_event_bus
+from game_store import STORE_BACKEND, get_store
+
+# What a bot's turn did
+LEFT = "left"
+ENDED = "ended"
+
+
+class Bot:
+    """Joins and gets ready, but otherwise never does anything"""
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rng = rng
+
+    def on_round_start(self, game):
+        pass
+
+    def act(self, game_id, game):
+        """Take one turn; may return LEFT or ENDED"""
+        return None
+
+
+class IdleBot(Bot):
+    """Never votes, so its rounds end on the timer"""
+
+
+class RandomVoter(Bot):
+    """Starts a vote now and then, and votes for a random other player"""
+
+    start_vote_chance = 0.05
+
+    def act(self, game_id, game):
+        if not game['voting_phase']:
+            if self.rng.random() < self.start_vote_chance:
+                start_voting(game_id)
+        elif not any(vote['voter'] == self.name for vote in game['votes'].values()):
+            others = [p for p in game['players'] if p != self.name]
+            # Everyone else may have left; the timer will end the round
+            if others:
+                vote_player(game_id, self.name, self.rng.choice(others))
+        return None
+
+
+class EliminatingSpy(RandomVoter):
+    """As the spy, crosses off locations and then makes a final guess"""
+
+    guess_chance = 0.3
+
+    def on_round_start(self, game):
+        self.remaining = list(LOCATIONS)
+
+    def act(self, game_id, game):
+        if game['spy'] != self.name:
+            return super().act(game_id, game)
+        if len(self.remaining) > room_setting(game, 'final_guess_locations'):
+            self.remaining.remove(self.rng.choice(self.remaining))
+            return None
+        if self.rng.random() < self.guess_chance:
+            final_guess = self.rng.choice(self.remaining)
+            guess_location(game_id, self.name, final_guess)
+            end_game(game_id, "spy" if final_guess == game['location'] else "non-spies")
+            return ENDED
+        return super().act(game_id, game)
+
+
+class Leaver(RandomVoter):
+    """Walks out of the room partway through"""
+
+    leave_chance = 0.02
+
+    def act(self, game_id, game):
+        if self.rng.random() < self.leave_chance:
+            leave_game(game_id, self.name)
+            return LEFT
+        return super().act(game_id, game)
+
+
+BOT_TYPES = {
+    'random': RandomVoter,
+    'spy': EliminatingSpy,
+    'idle': IdleBot,
+    'leaver': Leaver,
+}
+
+
+class Stats:
+    """Counters shared by all worker threads of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms_created = 0
+        self.games = 0
+        self.events = 0
+        self.violations = set()
+        self.crashes = []
+        self.ended_events = {}
+        # Rooms this process is playing; with SQLite the bus also delivers
+        # every other process's events
+        self.rooms = set()
+
+    def on_event(self, event):
+        with self.lock:
+            if event.game_id not in self.rooms:
+                return
+            self.events += 1
+            if event.type == GAME_ENDED:
+                self.ended_events[event.game_id] = self.ended_events.get(event.game_id, 0) + 1
+
+    def forget_room(self, game_id):
+        with self.lock:
+            self.rooms.discard(game_id)
+            self.ended_events.pop(game_id, None)
+
+
+class RoomSim:
+    """One room full of bots, advanced one step at a time"""
+
+    def __init__(self, rng, bots, rounds, stats, settings=None):
+        self.rng = rng
+        self.bots = bots
+        self.rounds_left = rounds
+        self.stats = stats
+        self.departed = set()
+        # Every vote seen so far, by ID, to catch one vote replacing another
+        self.votes_seen = {}
+        self.phase = 'lobby'
+        self.game_id = create_new_game(seed=rng.getrandbits(64), settings=settings)
+        with stats.lock:
+            stats.rooms_created += 1
+            stats.rooms.add(self.game_id)
+        for i, bot in enumerate(bots):
+            join_game(self.game_id, bot.name, is_host=(i == 0))
+
+    def load(self):
+        get_write_buffer().flush(self.game_id)
+        return get_store().load(self.game_id)
+
+    def violation(self, message):
+        with self.stats.lock:
+            self.stats.violations.add(f"{self.game_id}: {message}")
+
+    def check(self, game):
+        """Invariants that must hold after every step"""
+        players = game['players']
+        if game['game_started']:
+            spy = game['spy']
+            if not isinstance(spy, str) or (spy not in players and spy not in self.departed):
+                self.violation(f"spy {spy!r} is not a single player of the room")
+        for vote_id, vote in game['votes'].items():
+            if vote['voter'] not in players or vote['target'] not in players:
+                self.violation(f"orphaned vote {vote}")
+            seen = self.votes_seen.setdefault(vote_id, vote)
+            if seen != vote:
+                self.violation(f"{vote_id} was {seen}, overwritten by {vote}")
+        voters = [vote['voter'] for vote in game['votes'].values()]
+        if len(voters) != len(set(voters)):
+            self.violation(f"player voted twice: {voters}")
+        if not set(game['ready_players']) <= set(players):
+            self.violation("ready player who isn't in the room")
+
+    def close(self):
+        for bot in self.bots:
+            leave_game(self.game_id, bot.name)
+        self.bots = []
+
+    def finish_round(self, game):
+        if game['winner'] not in ("spy", "non-spies"):
+            self.violation(f"ended without a valid winner: {game['winner']!r}")
+        with self.stats.lock:
+            ended = self.stats.ended_events.pop(self.game_id, 0)
+            self.stats.games += 1
+        if ended != 1:
+            self.violation(f"{ended} game_ended events for one game")
+
+        self.rounds_left -= 1
+        if self.rounds_left <= 0:
+            self.close()
+            return False
+        reset_game(self.game_id)
+        self.phase = 'lobby'
+        return True
+
+    def step(self):
+        """Advance the room by one tick; False once the room is finished"""
+        game = self.load()
+        if game is None:
+            return False
+        self.check(game)
+
+        if self.phase == 'lobby':
+            if len(game['players']) < room_setting(game, 'min_players'):
+                self.close()
+                return False
+            for bot in self.bots:
+                if bot.name not in game['ready_players']:
+                    toggle_ready(self.game_id, bot.name)
+            if start_game(self.game_id):
+                self.phase = 'playing'
+                game = self.load()
+                for bot in self.bots:
+                    bot.on_round_start(game)
+            return True
+
+        if game['game_ended']:
+            return self.finish_round(game)
+        if game['voting_phase'] and resolve_votes(self.game_id, game) is not None:
+            return True
+        if end_if_time_up(self.game_id, game):
+            return True
+
+        for bot in list(self.bots):
+            outcome = bot.act(self.game_id, game)
+            if outcome == LEFT:
+                self.bots.remove(bot)
+                self.departed.add(bot.name)
+            elif outcome == ENDED:
+                break
+        return True
+
+
+def new_room(rng, args, stats):
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    bots = [
+        BOT_TYPES[kind](f"{kind}-{i}", random.Random(rng.random()))
+        for i, kind in enumerate(rng.choices(names, weights, k=rng.randint(*args.players)))
+    ]
+    return RoomSim(rng, bots, args.rounds, stats, {'round_seconds': args.round_seconds})
+
+
+def worker(rng, n_rooms, args, stats, deadline):
+    """Keep n_rooms rooms live until the deadline, then let them wind down"""
+    try:
+        run_rooms(rng, n_rooms, args, stats, deadline)
+    except Exception:
+        # A dead worker strands its rooms, so it fails the run like a violation
+        with stats.lock:
+            stats.crashes.append(traceback.format_exc())
+        raise
+
+
+def run_rooms(rng, n_rooms, args, stats, deadline):
+    rooms = [new_room(rng, args, stats) for _ in range(n_rooms)]
+    while rooms:
+        still_live = []
+        for room in rooms:
+            if room.step():
+                still_live.append(room)
+                continue
+            stats.forget_room(room.game_id)
+            if time.monotonic() < deadline:
+                still_live.append(new_room(rng, args, stats))
+        rooms = still_live
+        if args.tick:
+            time.sleep(args.tick)
+
+
+def rss_mb():
+    """Resident memory of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def trend(samples):
+    """Least-squares slope of (t, value) samples, per hour"""
+    if len(samples) < 2:
+        return 0.0
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in samples)
+    if not var_t:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var_t * 3600
+
+
+def run_simulation(args, process_index=0):
+    """Run one process's share of the rooms; returns its summary"""
+    stats = Stats()
+    get_event_bus().subscribe(None, stats.on_event)
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    rooms_per_worker = [args.rooms // args.workers + (i < args.rooms % args.workers) for i in range(args.workers)]
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(random.Random(f"{args.seed}-{process_index}-{i}"), n, args, stats, deadline),
+            daemon=True,
+        )
+        for i, n in enumerate(rooms_per_worker) if n
+    ]
+    for thread in threads:
+        thread.start()
+
+    samples = []
+    last_games, last_events, last_t = 0, 0, start
+    while any(thread.is_alive() for thread in threads):
+        time.sleep(0.2)
+        now = time.monotonic()
+        if now - last_t < args.report_every and any(thread.is_alive() for thread in threads):
+            continue
+        with stats.lock:
+            games, events = stats.games, stats.events
+        interval = now - last_t
+        if now < deadline:
+            # Only trend over the steady part, not the wind-down at the end
+            samples.append((now - start, rss_mb(), (games - last_games) / interval))
+        print(f"[p{process_index}] {now - start:7.0f}s  games={games:<8} "
+              f"{(games - last_games) / interval:7.1f} games/s  {(events - last_events) / interval:8.1f} events/s  "
+              f"rss={rss_mb():.1f}MB", flush=True)
+        last_games, last_events, last_t = games, events, now
+
+    get_write_buffer().flush()
+    # Ignore the first 10% of samples while caches warm up
+    steady = samples[len(samples) // 10:]
+    return {
+        'process': process_index,
+        'elapsed': time.monotonic() - start,
+        'rooms': stats.rooms_created,
+        'games': stats.games,
+        'events': stats.events,
+        'violations': sorted(stats.violations),
+        'crashes': list(stats.crashes),
+        'rss_mb': rss_mb(),
+        'rss_trend_mb_per_hour': trend([(t, rss) for t, rss, _ in steady]),
+        'throughput_trend_per_hour': trend([(t, rate) for t, _, rate in steady]),
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in BOT_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown bot type {kind!r}, pick from {', '.join(BOT_TYPES)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test WhoSpies with bot players")
+    parser.add_argument("--rooms", type=int, default=1000, help="rooms kept live at once (per process)")
+    parser.add_argument("--workers", type=int, default=8, help="worker threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (needs WHOSPIES_STORE=sqlite)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep creating rooms")
+    parser.add_argument("--rounds", type=int, default=5, help="games per room before it closes")
+    parser.add_argument("--players", type=int, nargs=2, default=[get_config()['min_players'], 6], metavar=("MIN", "MAX"))
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("random=4,spy=2,idle=1,leaver=1"),
+                        help="bot types and weights, e.g. random=4,spy=2,idle=1,leaver=1")
+    parser.add_argument("--round-seconds", type=float, default=2, help="round length of the simulated rooms")
+    parser.add_argument("--tick", type=float, default=0, help="pause between passes over a worker's rooms")
+    parser.add_argument("--report-every", type=float, default=10, help="seconds between progress lines")
+    parser.add_argument("--seed", default="whospies")
+    args = parser.parse_args()
+
+    if args.processes > 1 and STORE_BACKEND != "sqlite":
+        parser.error("--processes needs WHOSPIES_STORE=sqlite, the JSON store is single-process")
+
+    if args.processes == 1:
+        results = [run_simulation(args)]
+    else:
+        with ProcessPoolExecutor(args.processes) as pool:
+            results = list(pool.map(run_simulation, [args] * args.processes, range(args.processes)))
+
+    violations = [v for r in results for v in r['violations']]
+    crashes = [c for r in results for c in r['crashes']]
+    for r in results:
+        print(f"[p{r['process']}] {r['games']} games in {r['rooms']} rooms, {r['events']} events, "
+              f"{r['games'] / r['elapsed']:.1f} games/s; rss {r['rss_mb']:.1f}MB "
+              f"({r['rss_trend_mb_per_hour']:+.1f}MB/h), throughput trend {r['throughput_trend_per_hour']:+.1f} games/s per hour")
+    print(f"{len(violations)} invariant violations")
+    for violation in violations[:50]:
+        print(f"  {violation}")
+    print(f"{len(crashes)} crashed worker threads")
+    for crash in crashes[:5]:
+        print(crash)
+    sys.exit(1 if violations or crashes else 0)
+
+
+if __name__ == "__main__":
+    main()
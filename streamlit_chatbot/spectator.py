@@ -0,0 +1,104 @@
+"""Read-only spectator snapshots of WhoSpies rooms.
+
+Spectators never get the room itself. Each watched room has one redacted
+snapshot per process, rebuilt only when the room's version changes, and every
+viewer of the room is handed that same snapshot. The event bus is pumped at
+most once per `ttl` no matter how many viewers there are, so adding
+spectators adds no storage reads beyond that.
+"""
+import threading
+import time
+
+from game_events import RoomView, get_event_bus
+from game_store import get_store
+
+# Fields a spectator may see; spy, location and anything that gives them away
+# (votes, location guesses, the eliminated player) stay hidden
+PUBLIC_FIELDS = ('host', 'game_started', 'game_ended', 'voting_phase', 'start_time', 'end_time', 'winner', 'settings')
+
+
+def redact(game_id, game, version):
+    """Build the spectator snapshot of a room (None if it doesn't exist)"""
+    if game is None:
+        return None
+    snapshot = {field: game.get(field) for field in PUBLIC_FIELDS}
+    snapshot.update(
+        game_id=game_id,
+        version=version,
+        players=sorted(game['players']),
+        ready_players=sorted(game['ready_players']),
+        votes_cast=len(game['votes']),
+    )
+    return snapshot
+
+
+class _Watched:
+    def __init__(self, view):
+        self.view = view
+        self.snapshot = None
+        self.last_seen = time.monotonic()
+
+
+class SpectatorCache:
+    """Shared redacted snapshots, one per watched room.
+
+    Rooms nobody has looked at for `idle` seconds are dropped. Snapshots are
+    shared between viewers, so callers must not modify them.
+    """
+
+    def __init__(self, bus, store, ttl=1.0, idle=300):
+        self.ttl = ttl
+        self.idle = idle
+        self._bus = bus
+        self._store = store
+        self._lock = threading.Lock()
+        self._rooms = {}
+        self._last_pump = 0.0
+        self.rebuilds = 0
+
+    def get(self, game_id):
+        """The spectator snapshot of a room, or None if it doesn't exist"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_pump >= self.ttl:
+                self._last_pump = now
+                self._bus.pump(self._store)
+                self._evict(now)
+
+            watched = self._rooms.get(game_id)
+            if watched is None:
+                watched = self._rooms[game_id] = _Watched(RoomView(game_id, self._bus, self._store))
+            watched.last_seen = now
+
+            game = watched.view.refresh()
+            if watched.snapshot is None or watched.snapshot['version'] != watched.view.version:
+                watched.snapshot = redact(game_id, game, watched.view.version)
+                self.rebuilds += 1
+            if watched.snapshot is None:
+                # Unknown or closed room; don't keep watching it
+                del self._rooms[game_id]
+                watched.view.close()
+            return watched.snapshot
+
+    def _evict(self, now):
+        for game_id, watched in list(self._rooms.items()):
+            if now - watched.last_seen > self.idle:
+                del self._rooms[game_id]
+                watched.view.close()
+
+    def watched_rooms(self):
+        with self._lock:
+            return len(self._rooms)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_spectator_cache():
+    """Get the process-wide spectator cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SpectatorCache(get_event_bus(), get_store())
+        return _cache
@@ -0,0 +1,313 @@
+"""Tournament scheduling for WhoSpies.
+
+    python tournament.py players.txt --group-size 5 --rounds 3
+    python tournament.py --bots 300 --rounds 3 --round-seconds 5
+
+A tournament owns a fixed set of tables (rooms), created in bulk. Every
+round the players are shuffled into balanced groups, preferring groups of
+players who haven't met yet, and every table is reset, reseated and started
+with a single append_many, so setting up a round is one store transaction
+(one log flush for the JSON store) of O(players) events. Results are picked
+up from the event bus as tables finish; the spy scores SPY_WIN_POINTS for a
+win, each detective DETECTIVE_WIN_POINTS.
+
+Players are seated by the scheduler, not through "Join Mission": every seat
+gets a secret, and each round prints a link per player
+(?table=TABLE&player=NAME&seat=SECRET) that hands the seat to the first
+browser session that opens it. Spectators can follow any table with
+?spectate=TABLE. A table everyone walked out of counts as finished without
+a result, and gets a fresh room next round.
+"""
+import argparse
+import itertools
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+import game_engine
+from game_config import get_config, validate_room_settings
+from game_engine import (
+    LOCATIONS, MAX_ID_ATTEMPTS, end_if_time_up, generate_game_id, get_write_buffer, room_rng,
+)
+from game_events import (
+    GAME_ENDED, GAME_RESET, GAME_STARTED, PLAYER_JOINED, PLAYER_LEFT,
+    ROOM_CREATED, RoomEvent, apply_event, get_event_bus,
+)
+from game_store import get_store
+
+SPY_WIN_POINTS = 2
+DETECTIVE_WIN_POINTS = 1
+
+# Shuffles tried per round when looking for groups of strangers
+RESHUFFLE_TRIES = 20
+
+
+def group_sizes(n_players, group_size, min_players):
+    """Split n_players into tables of group_size or a little more, sizes differing by at most one"""
+    if n_players < min_players:
+        raise ValueError(f"A tournament needs at least {min_players} players")
+    tables = max(1, n_players // max(group_size, min_players))
+    base, extra = divmod(n_players, tables)
+    return [base + 1] * extra + [base] * (tables - extra)
+
+
+class Tournament:
+    """Seats players at tables round after round and keeps the score"""
+
+    def __init__(self, players, group_size=5, rng=None, settings=None):
+        if len(set(players)) != len(players):
+            raise ValueError("Player names must be unique")
+        self.players = list(players)
+        # Overrides stored in every table, e.g. a shorter round
+        self.settings = validate_room_settings(settings or {})
+        self.min_players = self.settings.get('min_players', get_config()['min_players'])
+        self.sizes = group_sizes(len(self.players), group_size, self.min_players)
+        self.rng = rng or random.Random()
+        self.round = 0
+        self.tables = []
+        self.seating = {}
+        # {table: {player: secret}} for the current round's seat links
+        self.seat_tokens = {}
+        self.points = {player: 0 for player in self.players}
+        self.results = []
+
+        self._store = get_store()
+        self._bus = get_event_bus()
+        self._lock = threading.Lock()
+        self._met = Counter()
+        self._spies = {}
+        self._started_at = {}
+        self._finished = set()
+        self._unsubscribe = self._bus.subscribe(None, self._on_event)
+
+    def _create_tables(self, count):
+        """Create count rooms with as few store writes as possible"""
+        tables = []
+        for _ in range(MAX_ID_ATTEMPTS):
+            events = [
+                RoomEvent(generate_game_id(), ROOM_CREATED, {'seed': self.rng.getrandbits(64), 'settings': self.settings})
+                for _ in range(count - len(tables))
+            ]
+            # Only IDs the store accepted become tables; collisions go round again
+            tables += [event.game_id for event, game in zip(events, self._store.append_many(events)) if game is not None]
+            if len(tables) == count:
+                return tables
+        raise RuntimeError("Could not allocate free game IDs for the tournament")
+
+    def _pair_score(self, groups):
+        return sum(self._met[pair] for group in groups for pair in itertools.combinations(sorted(group), 2))
+
+    def _make_groups(self):
+        best, best_score = None, None
+        for _ in range(RESHUFFLE_TRIES):
+            players = self.players[:]
+            self.rng.shuffle(players)
+            groups, start = [], 0
+            for size in self.sizes:
+                groups.append(players[start:start + size])
+                start += size
+            score = self._pair_score(groups)
+            if best is None or score < best_score:
+                best, best_score = groups, score
+                if score == 0:
+                    break
+        return best
+
+    def unfinished(self):
+        """Tables of the current round that haven't finished yet"""
+        with self._lock:
+            return [table for table in self.seating if table not in self._finished]
+
+    def start_round(self):
+        """Reshuffle and start the next round at every table in one write; returns the seating"""
+        if self.unfinished():
+            raise RuntimeError(f"Round {self.round} is still being played")
+        if not self.tables:
+            self.tables = self._create_tables(len(self.sizes))
+        else:
+            # Everyone walked out of these, which closed them; start afresh
+            closed = [table for table in self.tables if self._store.version(table) == 0]
+            if closed:
+                fresh = iter(self._create_tables(len(closed)))
+                self.tables = [next(fresh) if table in closed else table for table in self.tables]
+        # Anything clicked at the tables has to land before they're reset
+        get_write_buffer().flush()
+
+        groups = self._make_groups()
+        events, starts, seat_tokens = [], {}, {}
+        for table, group in zip(self.tables, groups):
+            seated = self.seating.get(table, [])
+            # Players who stay at the table keep their seat, secret and all
+            kept = self.seat_tokens.get(table, {})
+            tokens = seat_tokens[table] = {
+                player: kept[player] if player in seated else secrets.token_urlsafe(12) for player in group
+            }
+            table_events = [RoomEvent(table, GAME_RESET, {})] if seated else []
+            # Newcomers join before anyone leaves, so the room never empties
+            for i, player in enumerate(group):
+                if i == 0 or player not in seated:
+                    table_events.append(RoomEvent(table, PLAYER_JOINED, {
+                        'player': player, 'host': i == 0, 'seat_token': tokens[player],
+                    }))
+            for player in seated:
+                if player not in group:
+                    table_events.append(RoomEvent(table, PLAYER_LEFT, {'player': player}))
+
+            # Spy and location come from the table's own seed, exactly as
+            # start_game would pick them once the table is seated
+            game = self._store.load(table)
+            for event in table_events:
+                game = apply_event(game, event)
+            rng = room_rng(game, "start")
+            spy = rng.choice(list(game['players']))
+            starts[table] = RoomEvent(table, GAME_STARTED, {
+                'spy': spy, 'location': rng.choice(LOCATIONS), 'min_players': self.min_players,
+            })
+            events += table_events + [starts[table]]
+
+        results = self._store.append_many(events)
+        for event, game in zip(events, results):
+            if event.type == GAME_STARTED and (game is None or game['spy'] != event.data['spy']):
+                raise RuntimeError(f"Table {event.game_id} changed while the round was being set up")
+
+        with self._lock:
+            self.round += 1
+            self.seating = dict(zip(self.tables, groups))
+            self.seat_tokens = seat_tokens
+            self._spies = {table: event.data['spy'] for table, event in starts.items()}
+            self._started_at = {table: event.seq for table, event in starts.items()}
+            self._finished = set()
+        for group in groups:
+            self._met.update(itertools.combinations(sorted(group), 2))
+        self._bus.pump(self._store)
+        return self.seating
+
+    def _on_event(self, event):
+        if event.type != GAME_ENDED:
+            return
+        with self._lock:
+            table = event.game_id
+            if table not in self.seating or table in self._finished or event.seq <= self._started_at[table]:
+                return
+            # The first GAME_ENDED after the start is the one the room kept
+            self._finished.add(table)
+            spy, winner = self._spies[table], event.data['winner']
+            if winner == "spy":
+                self.points[spy] += SPY_WIN_POINTS
+            else:
+                for player in self.seating[table]:
+                    if player != spy:
+                        self.points[player] += DETECTIVE_WIN_POINTS
+            self.results.append({
+                'round': self.round, 'table': table, 'winner': winner,
+                'spy': spy, 'players': list(self.seating[table]),
+            })
+
+    def poll(self):
+        """Collect finished tables and end those whose time is up; True once the round is over"""
+        self._bus.pump(self._store)
+        for table in self.unfinished():
+            game = self._store.load(table)
+            if game is None:
+                # Everyone left ("Abort Mission"), which closed the room; no result
+                with self._lock:
+                    self._finished.add(table)
+            else:
+                end_if_time_up(table, game)
+        return not self.unfinished()
+
+    def standings(self):
+        """(player, points) pairs, best first"""
+        return sorted(self.points.items(), key=lambda item: (-item[1], item[0]))
+
+    def close(self):
+        """Stop listening and close every table in one write"""
+        self._unsubscribe()
+        events = [
+            RoomEvent(table, PLAYER_LEFT, {'player': player})
+            for table, group in self.seating.items() for player in group
+        ]
+        self._store.append_many(events)
+        self._bus.pump(self._store)
+
+
+def play_with_bots(tournament, rng):
+    """Drive every seat with a simulator bot until the round is over"""
+    from simulator import BOT_TYPES, ENDED
+
+    bots = {table: [BOT_TYPES['spy'](player, random.Random(rng.random())) for player in group]
+            for table, group in tournament.seating.items()}
+    for table, table_bots in bots.items():
+        game = get_store().load(table)
+        for bot in table_bots:
+            bot.on_round_start(game)
+    while not tournament.poll():
+        for table in tournament.unfinished():
+            game_engine.get_write_buffer().flush(table)
+            game = get_store().load(table)
+            if game is None or game['game_ended']:
+                continue
+            if game['voting_phase'] and game_engine.resolve_votes(table, game) is not None:
+                continue
+            for bot in bots[table]:
+                if bot.act(table, game) == ENDED:
+                    break
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a WhoSpies tournament")
+    parser.add_argument("players", nargs="?", help="file with one player name per line")
+    parser.add_argument("--bots", type=int, default=0, help="fill the tournament with this many bot players instead")
+    parser.add_argument("--group-size", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--round-seconds", type=float, help="round length at every table (default from the config)")
+    parser.add_argument("--seed", default=None)
+    parser.add_argument("--url", default="http://localhost:8501/", help="where WhoSpies.py is served, for the seat links")
+    args = parser.parse_args()
+
+    if args.bots:
+        players = [f"bot-{i}" for i in range(args.bots)]
+    elif args.players:
+        with open(args.players) as f:
+            players = [line.strip() for line in f if line.strip()]
+    else:
+        parser.error("give a players file or --bots")
+
+    settings = {} if args.round_seconds is None else {'round_seconds': args.round_seconds}
+    rng = random.Random(args.seed)
+    tournament = Tournament(players, args.group_size, rng, settings)
+    try:
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            seating = tournament.start_round()
+            print(f"Round {tournament.round}: {len(seating)} tables set up in "
+                  f"{(time.perf_counter() - start) * 1000:.1f}ms")
+            if args.bots:
+                play_with_bots(tournament, rng)
+            else:
+                for table, group in seating.items():
+                    print(f"  {table}  (spectate: {args.url}?spectate={table})")
+                    for player in group:
+                        seat = tournament.seat_tokens[table][player]
+                        print(f"    {player}: {args.url}?{urlencode({'table': table, 'player': player, 'seat': seat})}")
+                while not tournament.poll():
+                    time.sleep(1)
+            round_results = [r for r in tournament.results if r['round'] == tournament.round]
+            spy_wins = sum(1 for r in round_results if r['winner'] == "spy")
+            print(f"  finished: spy won {spy_wins} of {len(round_results)} tables")
+    except KeyboardInterrupt:
+        print("Stopped")
+    finally:
+        tournament.close()
+
+    print("Standings:")
+    for place, (player, points) in enumerate(tournament.standings()[:20], 1):
+        print(f"{place:>4}. {player:<20} {points}")
+
+
+if __name__ == "__main__":
+    main()